@@ -0,0 +1,361 @@
+import argparse
+import asyncio
+import json
+import platform
+import re
+import statistics
+import subprocess
+import threading
+import time
+import tracemalloc
+import zlib
+
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Callable
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from reelsmith.compress import ResearchCompressor
+from reelsmith.instrumentation import peak_rss_bytes
+from reelsmith.llm import LLM
+from reelsmith.research import SearXNGResearch
+from reelsmith.script import ScriptGenerator
+from reelsmith.stub import ImagePromptList, ImagePromptSegment, ImageSegmentList, ScriptDraft, State
+from reelsmith.subtitles import SubtitleGenerator
+from reelsmith.tts import SAMPLE_RATE, KokoroPipelinePool, TTSGenerator
+
+# Default location of benchmark results; ignored by git.
+RESULTS_DIR = Path(__file__).parent / "results"
+
+WORDS = ("the quick brown fox jumps over the lazy dog while researchers measure every step of the "
+         "process with great care and attention to detail").split()
+
+
+def paragraph_html(page_size: int, seed: int) -> bytes:
+    paragraphs = []
+    size = 0
+    i = seed
+
+    while size < page_size:
+        text = " ".join(WORDS[(i + j) % len(WORDS)] for j in range(60))
+        paragraphs.append(f"<div class=\"c\"><p>{text}.</p><span>{i}</span></div>")
+        size += len(paragraphs[-1])
+        i += 1
+
+    return f"<html><head><title>{seed}</title></head><body>{''.join(paragraphs)}</body></html>".encode()
+
+
+class FakeSearchHandler(BaseHTTPRequestHandler):
+    server: "FakeSearchServer"
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _send(self, body: bytes, content_type: str) -> None:
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self) -> None:
+        url = urlsplit(self.path)
+
+        if url.path == "/search":
+            topic = parse_qs(url.query).get("q", [""])[0]
+            results = [{"url": f"{self.server.base_url}/page/{zlib.crc32(topic.encode()) % 1000}-{i}"}
+                       for i in range(self.server.pages)]
+            self._send(json.dumps({"results": results}).encode(), "application/json")
+
+        elif url.path.startswith("/page/"):
+            seed = sum(int(part) for part in url.path.rsplit("/", 1)[1].split("-"))
+            self._send(paragraph_html(self.server.page_size, seed), "text/html; charset=utf-8")
+
+        else:
+            self.send_error(404)
+
+
+class FakeSearchServer(ThreadingHTTPServer):
+    def __init__(self, pages: int, page_size: int) -> None:
+        super().__init__(("127.0.0.1", 0), FakeSearchHandler)
+        self.pages = pages
+        self.page_size = page_size
+        self.base_url = f"http://127.0.0.1:{self.server_address[1]}"
+
+    def __enter__(self) -> "FakeSearchServer":
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *args: Any) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def fake_script(prompt: str) -> ScriptDraft:
+    topic = re.search(r"Topic: (.*)", prompt).group(1).strip()
+    words = []
+
+    for i in range(14):
+        words += ["Fact", str(i + 1), "about", *topic.split(), "is", *WORDS[i:i + 8], "."]
+
+    return ScriptDraft(script_plaintext=" ".join(words).replace(" .", "."), script_words=words)
+
+
+def fake_image_segments(prompt: str, segments: int = 6) -> ImageSegmentList:
+    last_index = int(re.search(r"end at index (\d+)", prompt).group(1))
+    bounds = np.linspace(0, last_index + 1, segments + 1).astype(int)
+
+    return ImageSegmentList(image_segments=[
+        ImagePromptSegment(prompt=f"A detailed illustration of segment {i}", word_range=[int(start), int(end) - 1])
+        for i, (start, end) in enumerate(zip(bounds[:-1], bounds[1:]))
+    ])
+
+
+def fake_image_prompts(prompt: str) -> ImagePromptList:
+    count = int(re.search(r"list of exactly (\d+) strings", prompt).group(1))
+    return ImagePromptList(prompts=[f"A detailed illustration of segment {i}" for i in range(count)])
+
+
+STRUCTURED_FAKES: dict[type, Callable[[str], Any]] = {
+    ScriptDraft: fake_script,
+    ImageSegmentList: fake_image_segments,
+    ImagePromptList: fake_image_prompts,
+}
+
+
+def prompt_text(input: Any) -> str:
+    if isinstance(input, str):
+        return input
+
+    if hasattr(input, "to_string"):
+        return input.to_string()
+
+    return "\n".join(str(getattr(message, "content", message)) for message in input)
+
+
+class FakeChatModel(BaseChatModel):
+    latency: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake"
+
+    def _generate(self, messages: list[BaseMessage], stop: list[str] | None = None, run_manager: Any = None,
+                  **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        words = prompt_text(messages).split()[-500:]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=" ".join(words)))])
+
+    def with_structured_output(self, schema: Any, **kwargs: Any) -> RunnableLambda:
+        def structured(input: Any, **kwargs: Any) -> Any:
+            time.sleep(self.latency)
+            return STRUCTURED_FAKES[schema](prompt_text(input))
+
+        return RunnableLambda(structured)
+
+
+class FakeLLM(LLM):
+    def __init__(self, model: str = "fake", latency: float = 0.0) -> None:
+        super().__init__(model)
+        self.llm = FakeChatModel(latency=latency)
+
+
+class StubToken:
+    def __init__(self, text: str, start_ts: float, end_ts: float) -> None:
+        self.text = text
+        self.whitespace = " "
+        self.start_ts = start_ts
+        self.end_ts = end_ts
+
+
+class StubResult:
+    def __init__(self, audio: np.ndarray, tokens: list[StubToken]) -> None:
+        self.audio = audio
+        self.tokens = tokens
+
+    def __iter__(self):
+        return iter((None, None, self.audio))
+
+
+class StubPipeline:
+    def __init__(self, seconds_per_word: float = 0.3) -> None:
+        self.seconds_per_word = seconds_per_word
+
+    def __call__(self, text: str, voice: str, speed: float = 1.0):
+        words = text.split()
+
+        for start in range(0, len(words), 40):
+            chunk = words[start:start + 40]
+            step = self.seconds_per_word / speed
+            samples = int(len(chunk) * step * SAMPLE_RATE)
+            t = np.arange(samples, dtype=np.float32) / SAMPLE_RATE
+
+            tokens = [StubToken(word, i * step, (i + 1) * step) for i, word in enumerate(chunk)]
+            yield StubResult(0.1 * np.sin(2 * np.pi * 220 * t).astype(np.float32), tokens)
+
+
+class StubPipelinePool(KokoroPipelinePool):
+    def _create(self, lang_code: str, repo_id: str, voice: str) -> StubPipeline:
+        return StubPipeline()
+
+
+@dataclass
+class Stages:
+    research: Callable[[State], State]
+    compress: Callable[[State], State]
+    script: Callable[[State], State]
+    tts: Callable[[State], State]
+    captions: Callable[[State], State]
+
+
+def build_stages(server: FakeSearchServer, args: argparse.Namespace) -> Stages:
+    llm = FakeLLM(latency=args.llm_latency)
+    research = SearXNGResearch(llm, "", searxng_url=server.base_url)
+    script = ScriptGenerator(llm, "")
+    tts = TTSGenerator("af_bella", speed=1.25, pool=None if args.real_tts else StubPipelinePool())
+    captions = SubtitleGenerator(mode="tts")
+
+    def run_script(state: State) -> State:
+        return script.generate_image_prompts(script.generate_script_words(state))
+
+    return Stages(
+        research=lambda state: asyncio.run(research.research(state)),
+        compress=ResearchCompressor().compress_research,
+        script=run_script,
+        tts=tts.run_tts,
+        captions=captions.generate_captions,
+    )
+
+
+def summarize(samples: list[float]) -> dict[str, float]:
+    return {
+        "mean": statistics.fmean(samples),
+        "p50": statistics.median(samples),
+        "max": max(samples),
+        "min": min(samples),
+    }
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    timings: dict[str, list[float]] = {}
+    peaks: dict[str, int] = {}
+
+    tracemalloc.start()
+
+    with FakeSearchServer(args.pages, args.page_size) as server:
+        stages = build_stages(server, args)
+        start = time.perf_counter()
+
+        for i in range(args.topics):
+            state = State(topic=f"benchmark topic {i}")
+
+            for name in ("research", "compress", "script", "tts", "captions"):
+                tracemalloc.reset_peak()
+                stage_start = time.perf_counter()
+
+                state = getattr(stages, name)(state)
+
+                timings.setdefault(name, []).append(time.perf_counter() - stage_start)
+                peaks[name] = max(peaks.get(name, 0), tracemalloc.get_traced_memory()[1])
+
+            for path in (state.final_audio_path, state.caption_path):
+                if path is not None:
+                    Path(path).unlink(missing_ok=True)
+
+        elapsed = time.perf_counter() - start
+
+    tracemalloc.stop()
+
+    return {
+        "version": package_version(),
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {
+            "topics": args.topics,
+            "pages": args.pages,
+            "page_size": args.page_size,
+            "llm_latency": args.llm_latency,
+            "real_tts": args.real_tts,
+        },
+        "stages": {
+            name: {**summarize(samples), "peak_python_bytes": peaks[name]}
+            for name, samples in timings.items()
+        },
+        "total_seconds": elapsed,
+        "topics_per_second": args.topics / elapsed,
+        "peak_rss_bytes": peak_rss_bytes(),
+    }
+
+
+def package_version() -> str:
+    try:
+        return version("ReelSmith")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result: dict[str, Any], baseline: dict[str, Any], tolerance: float) -> list[str]:
+    regressions = []
+
+    for name, stats in result["stages"].items():
+        previous = baseline.get("stages", {}).get(name)
+
+        if previous and stats["p50"] > previous["p50"] * (1 + tolerance):
+            regressions.append(f"{name}: p50 {previous['p50']:.4f}s -> {stats['p50']:.4f}s")
+
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Offline end-to-end benchmark for the ReelSmith pipeline.")
+    parser.add_argument("--topics", type=int, default=3)
+    parser.add_argument("--pages", type=int, default=5, help="Result pages returned per search.")
+    parser.add_argument("--page-size", type=int, default=200_000, help="Approximate HTML bytes per page.")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="Seconds each fake LLM call sleeps.")
+    parser.add_argument("--real-tts", action="store_true", help="Use Kokoro instead of the TTS stub.")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "pipeline.json")
+    parser.add_argument("--baseline", type=Path, help="Previous results to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, indent=2))
+
+    for name, stats in result["stages"].items():
+        print(f"{name:>10}: p50={stats['p50'] * 1000:8.1f} ms  max={stats['max'] * 1000:8.1f} ms  "
+              f"peak={stats['peak_python_bytes'] / 1024 ** 2:7.1f} MiB")
+    print(f"{'total':>10}: {result['total_seconds']:.2f} s, {result['topics_per_second']:.2f} topics/s, "
+          f"peak RSS {result['peak_rss_bytes'] / 1024 ** 2:.1f} MiB")
+
+    if args.baseline is not None:
+        regressions = compare(result, json.loads(args.baseline.read_text()), args.tolerance)
+
+        for regression in regressions:
+            print(f"regression: {regression}")
+
+        if regressions:
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
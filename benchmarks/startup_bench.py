@@ -0,0 +1,119 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any
+
+from benchmarks.pipeline_bench import RESULTS_DIR, git_commit, package_version
+
+TARGETS = {
+    "cli": "import reelsmith.__main__",
+    "pipeline": "import reelsmith.pipeline",
+    "batch": "import reelsmith.batch",
+    "research": "import reelsmith.research",
+    "tts": "import reelsmith.tts",
+    "subtitles": "import reelsmith.subtitles",
+    "render": "import reelsmith.render",
+}
+
+# Backends that must only be imported once a stage actually uses them.
+HEAVY_MODULES = (
+    "torch",
+    "torchaudio",
+    "whisperx",
+    "kokoro",
+    "langgraph",
+    "langchain_core",
+    "langchain_google_genai",
+    "langchain_ollama",
+)
+
+PROBE = """
+import json, sys, time
+start = time.perf_counter()
+{statement}
+elapsed = time.perf_counter() - start
+from reelsmith.instrumentation import peak_rss_bytes
+print(json.dumps({{"seconds": elapsed, "peak_rss_bytes": peak_rss_bytes(),
+                  "heavy": [m for m in {heavy!r} if m in sys.modules]}}))
+"""
+
+
+def probe(statement: str) -> dict[str, Any]:
+    output = subprocess.run([sys.executable, "-c", PROBE.format(statement=statement, heavy=HEAVY_MODULES)],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def run_benchmark(args: argparse.Namespace) -> dict[str, Any]:
+    targets = {}
+
+    for name, statement in TARGETS.items():
+        samples = [probe(statement) for _ in range(args.repeat)]
+        seconds = [sample["seconds"] for sample in samples]
+
+        targets[name] = {
+            "p50": statistics.median(seconds),
+            "max": max(seconds),
+            "min": min(seconds),
+            "peak_rss_bytes": max(sample["peak_rss_bytes"] for sample in samples),
+            "heavy_modules": sorted({module for sample in samples for module in sample["heavy"]}),
+        }
+
+    return {
+        "version": package_version(),
+        "commit": git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "config": {"repeat": args.repeat},
+        "targets": targets,
+    }
+
+
+def check(result: dict[str, Any], baseline: dict[str, Any] | None, tolerance: float) -> list[str]:
+    problems = []
+
+    for name, stats in result["targets"].items():
+        if stats["heavy_modules"]:
+            problems.append(f"{name}: imports {', '.join(stats['heavy_modules'])} at startup")
+
+        previous = (baseline or {}).get("targets", {}).get(name)
+        if previous and stats["p50"] > previous["p50"] * (1 + tolerance):
+            problems.append(f"{name}: p50 {previous['p50']:.4f}s -> {stats['p50']:.4f}s")
+
+    return problems
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Import time and memory of the ReelSmith entry points.")
+    parser.add_argument("--repeat", type=int, default=5, help="Fresh interpreters per target.")
+    parser.add_argument("--output", type=Path, default=RESULTS_DIR / "startup.json")
+    parser.add_argument("--baseline", type=Path, help="Previous results to check for regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.3)
+    args = parser.parse_args()
+
+    result = run_benchmark(args)
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps(result, indent=2))
+
+    for name, stats in result["targets"].items():
+        print(f"{name:>10}: p50={stats['p50'] * 1000:8.1f} ms  max={stats['max'] * 1000:8.1f} ms  "
+              f"rss={stats['peak_rss_bytes'] / 1024 ** 2:7.1f} MiB")
+
+    baseline = json.loads(args.baseline.read_text()) if args.baseline is not None else None
+    problems = check(result, baseline, args.tolerance)
+
+    for problem in problems:
+        print(f"regression: {problem}")
+
+    if problems:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -17,6 +17,8 @@ from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
 from langgraph.graph import StateGraph, END
 from pydantic import BaseModel
 
+from reelsmith.subtitles import model_registry
+
 LLM_MODEL = "huihui_ai/qwen3-abliterated:8b"
 
 
@@ -165,10 +167,13 @@ def write_srt(subs, path="output/narration.srt"):
 
 
 def generate_captions(state: ScriptState) -> dict:
-    model = whisperx.load_model("large-v2", device="cuda" if torch.cuda.is_available() else "cpu", compute_type="int8")
+    device = "cuda" if torch.cuda.is_available() else "cpu"
+    model = model_registry.get(("asr", "large-v2", device, "int8", None),
+                               lambda: whisperx.load_model("large-v2", device=device, compute_type="int8"))
     result = model.transcribe(state.audio_path)
 
-    align_model, metadata = whisperx.load_align_model(language_code="en", device="cpu")
+    align_model, metadata = model_registry.get(("align", None, "cpu", None, "en"),
+                                               lambda: whisperx.load_align_model(language_code="en", device="cpu"))
     aligned = whisperx.align(result["segments"], align_model, metadata, state.audio_path, device="cpu")
     words = aligned["word_segments"]
 
@@ -1,51 +1,202 @@
-import asyncio
+import logging
 
-from langgraph.graph import StateGraph, END
+from pathlib import Path
+from typing import Optional
+
+import typer
 
 from reelsmith.stub import State
-from reelsmith.llm import GoogleLLM, OllamaLLM
-from reelsmith.research import SearXNGResearch
-from reelsmith.script import ScriptGenerator
 
+app = typer.Typer()
 
-def input_node(state: State) -> State:
-    return state.model_dump()
+DAY = 24 * 60 * 60
 
 
-def research_node(state: State) -> State:
-    search_engine = SearXNGResearch(GoogleLLM("gemini-2.5-flash"), "")
-    # search_engine = SearXNGResearch(OllamaLLM("mistral"), "")
-    state = asyncio.run(search_engine.research(state)).model_dump()
-    return state
+def write_metrics(recorder, path: Path) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(recorder.to_json(indent=2) if path.suffix == ".json" else recorder.to_prometheus())
 
 
-def script_node(state: State) -> State:
-    script_generator = ScriptGenerator(GoogleLLM("gemini-2.5-flash"), "")
+def checkpoint_store(checkpoints: bool, checkpoint_dir: Optional[Path], max_age: float = DAY,
+                     fresh: list[str] = ()):
+    """The checkpoint store to resume from, with the checkpoints of the ``fresh`` run ids removed."""
+    from reelsmith.checkpoint import CheckpointStore
 
-    state = script_generator.generate_script_words(state)
+    if not checkpoints:
+        return None
 
-    script_generator = ScriptGenerator(OllamaLLM("mistral"), "")
+    store = CheckpointStore(checkpoint_dir, max_age) if checkpoint_dir is not None \
+        else CheckpointStore(max_age=max_age)
 
-    state = script_generator.generate_image_prompts(state)
+    for run_id in fresh:
+        store.clear(run_id)
 
-    return state.model_dump()
+    return store
 
 
-builder = StateGraph(State)
-builder.add_node("input", input_node)
-builder.add_node("research", research_node)
-builder.add_node("script", script_node)
+@app.callback(invoke_without_command=True)
+def main(ctx: typer.Context) -> None:
+    # Shows which stages are skipped because of a checkpoint, and which research sources are dropped.
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
 
-builder.set_entry_point("input")
-builder.add_edge("input", "research")
-builder.add_edge("research", "script")
-builder.add_edge("script", END)
+    if ctx.invoked_subcommand is None:
+        run(topic=None, run_id=None, checkpoints=True, checkpoint_dir=None, checkpoint_max_age=DAY, fresh=False,
+            metrics=None, overlap_captions=False, stream_script=False)
 
-graph = builder.compile()
 
-if __name__ == "__main__":
-    topic = input("Enter a video topic: ")
-    result = State(**graph.invoke(State(topic=topic)))
+@app.command()
+def run(topic: Optional[str] = typer.Argument(None),
+        run_id: Optional[str] = None,
+        checkpoints: bool = True,
+        checkpoint_dir: Optional[Path] = None,
+        checkpoint_max_age: float = typer.Option(DAY, help="Seconds after which checkpoints are ignored."),
+        fresh: bool = typer.Option(False, help="Discard this run's checkpoints and redo every stage."),
+        metrics: Optional[Path] = None,
+        overlap_captions: bool = False,
+        stream_script: bool = False) -> None:
+    from reelsmith.checkpoint import run_id_for
+    from reelsmith.instrumentation import Recorder, recording
+    from reelsmith.pipeline import build_graph, select_stages
+
+    if topic is None:
+        topic = input("Enter a video topic: ")
+
+    store = checkpoint_store(checkpoints, checkpoint_dir, checkpoint_max_age,
+                             fresh=[run_id or run_id_for(topic)] if fresh else [])
+    graph = build_graph(stages=select_stages(overlap_captions, stream_script), store=store, run_id=run_id)
+    recorder = Recorder(run_id=run_id or topic)
+
+    with recording(recorder):
+        result = State(**graph.invoke(State(topic=topic)))
+
+    if metrics is not None:
+        write_metrics(recorder, metrics)
 
     print("\n--- Generated Script ---\n")
     print(result)
+
+
+@app.command()
+def batch(topics_file: Path,
+          llm_workers: int = 4,
+          tts_workers: int = 2,
+          asr_workers: int = 1,
+          ffmpeg_workers: int = 2,
+          checkpoints: bool = True,
+          checkpoint_dir: Optional[Path] = None,
+          checkpoint_max_age: float = typer.Option(DAY, help="Seconds after which checkpoints are ignored."),
+          fresh: bool = typer.Option(False, help="Discard the topics' checkpoints and redo every stage."),
+          metrics_dir: Optional[Path] = None,
+          overlap_captions: bool = False,
+          stream_script: bool = False) -> None:
+    from reelsmith.batch import BatchRunner
+    from reelsmith.pipeline import select_stages
+    from reelsmith.checkpoint import run_id_for
+
+    topics = [line.strip() for line in topics_file.read_text().splitlines() if line.strip()]
+    workers = {"llm": llm_workers, "tts": tts_workers, "asr": asr_workers, "ffmpeg": ffmpeg_workers}
+
+    stages = select_stages(overlap_captions, stream_script)
+
+    store = checkpoint_store(checkpoints, checkpoint_dir, checkpoint_max_age,
+                             fresh=[run_id_for(topic) for topic in topics] if fresh else [])
+
+    with BatchRunner(stages=stages, workers=workers, store=store) as runner:
+        futures = [(topic, runner.submit(topic)) for topic in topics]
+
+        for topic, future in futures:
+            error = future.exception()
+
+            if error is not None:
+                print(f"[failed] {topic}: {error!r}")
+            else:
+                result = future.result()
+                print(f"[done] {topic}: audio={result.final_audio_path} captions={result.caption_path} "
+                      f"video={result.video_path}")
+
+            if metrics_dir is not None:
+                write_metrics(runner.recorders[topic], metrics_dir / f"{run_id_for(topic)}.json")
+
+
+@app.command()
+def worker(host: str = "127.0.0.1",
+           port: int = 8765,
+           socket: Optional[Path] = typer.Option(None, help="Serve on a Unix socket instead of TCP."),
+           jobs: int = typer.Option(1, help="Videos rendered concurrently."),
+           keep_jobs: int = typer.Option(100, help="Finished jobs remembered by the job API."),
+           warm: bool = True,
+           checkpoints: bool = True,
+           checkpoint_dir: Optional[Path] = None,
+           checkpoint_max_age: float = typer.Option(DAY, help="Seconds after which checkpoints are ignored."),
+           overlap_captions: bool = False,
+           stream_script: bool = False) -> None:
+    from reelsmith.pipeline import select_stages
+    from reelsmith.worker import Worker, serve
+
+    job_worker = Worker(stages=select_stages(overlap_captions, stream_script),
+                        store=checkpoint_store(checkpoints, checkpoint_dir, checkpoint_max_age),
+                        jobs=jobs, keep_jobs=keep_jobs)
+
+    if warm:
+        job_worker.warm()
+
+    print(f"Listening on {socket if socket is not None else f'http://{host}:{port}'}")
+    serve(job_worker, host=host, port=port, socket_path=socket)
+
+
+@app.command()
+def dispatch(topics_file: Path,
+             broker: Optional[Path] = typer.Option(None, help="SQLite broker file shared with the stage workers."),
+             wait: bool = True,
+             poll_interval: float = 2.0,
+             overlap_captions: bool = False,
+             stream_script: bool = False) -> None:
+    from reelsmith.broker import Dispatcher, SQLiteBroker
+    from reelsmith.pipeline import select_stages
+
+    topics = [line.strip() for line in topics_file.read_text().splitlines() if line.strip()]
+    dispatcher = Dispatcher(SQLiteBroker(broker) if broker is not None else SQLiteBroker(),
+                            stages=select_stages(overlap_captions, stream_script))
+    run_ids = [(topic, dispatcher.submit(topic)) for topic in topics]
+
+    for topic, run_id in run_ids:
+        if not wait:
+            print(f"[queued] {topic}: {run_id}")
+            continue
+
+        status = dispatcher.wait(run_id, poll_interval=poll_interval)
+        if status["status"] == "failed":
+            print(f"[failed] {topic}: {status['stage']}: {status['error']}")
+        else:
+            state = status["result"]["state"]
+            print(f"[done] {topic}: audio={state.get('final_audio_path')} captions={state.get('caption_path')} "
+                  f"video={state.get('video_path')}")
+
+
+@app.command("stage-worker")
+def stage_worker(stage: list[str] = typer.Option(..., help="Stage to serve; repeat for several."),
+                 broker: Optional[Path] = typer.Option(None, help="SQLite broker file shared with the dispatcher."),
+                 artifacts_dir: Optional[Path] = typer.Option(None, help="Artifact directory shared by all workers."),
+                 lease: float = 600,
+                 max_attempts: int = 3,
+                 poll_interval: float = 1.0,
+                 metrics: Optional[Path] = None) -> None:
+    from reelsmith.broker import ArtifactStore, SQLiteBroker, StageWorker
+
+    worker = StageWorker(SQLiteBroker(broker) if broker is not None else SQLiteBroker(),
+                         ArtifactStore(artifacts_dir) if artifacts_dir is not None else ArtifactStore(),
+                         stages=stage, lease=lease, max_attempts=max_attempts, poll_interval=poll_interval)
+
+    print(f"{worker.worker_id} serving {', '.join(stage)}")
+
+    try:
+        worker.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if metrics is not None:
+            write_metrics(worker.recorder, metrics)
+
+
+if __name__ == "__main__":
+    app()
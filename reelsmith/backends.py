@@ -0,0 +1,55 @@
+import importlib
+import threading
+
+from typing import Any
+
+from reelsmith import instrumentation
+
+
+class BackendRegistry:
+    """Maps backend names to ``module`` or ``module:attribute`` targets that are imported on first use."""
+
+    def __init__(self) -> None:
+        self._targets: dict[str, str] = {}
+        self._loaded: dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def register(self, name: str, target: str) -> None:
+        self._targets[name] = target
+
+    def get(self, name: str) -> Any:
+        if name in self._loaded:
+            return self._loaded[name]
+
+        if name not in self._targets:
+            raise ValueError(f"Unknown backend: {name}")
+
+        with self._lock:
+            if name not in self._loaded:
+                module_name, _, attribute = self._targets[name].partition(":")
+
+                with instrumentation.span("backend.import", backend=name):
+                    module = importlib.import_module(module_name)
+
+                self._loaded[name] = getattr(module, attribute) if attribute else module
+
+        return self._loaded[name]
+
+    def loaded(self) -> list[str]:
+        return list(self._loaded)
+
+    def warm(self, *names: str) -> None:
+        for name in names:
+            self.get(name)
+
+
+backends = BackendRegistry()
+
+backends.register("langgraph", "langgraph.graph")
+backends.register("llm.google", "langchain_google_genai.chat_models:ChatGoogleGenerativeAI")
+backends.register("llm.ollama", "langchain_ollama.chat_models:ChatOllama")
+backends.register("kokoro.model", "kokoro:KModel")
+backends.register("kokoro.pipeline", "kokoro:KPipeline")
+backends.register("torch", "torch")
+backends.register("torchaudio", "torchaudio")
+backends.register("whisperx", "whisperx")
@@ -0,0 +1,108 @@
+import itertools
+import threading
+
+from concurrent.futures import Future
+from queue import PriorityQueue
+from typing import Callable, Iterable
+
+from reelsmith import instrumentation
+from reelsmith.checkpoint import CheckpointStore
+from reelsmith.pipeline import STAGES, Stage, checkpoint_stages
+from reelsmith.stub import State
+
+DEFAULT_WORKERS = {
+    "llm": 4,
+    "cpu": 1,
+    "tts": 2,
+    "asr": 1,
+    "ffmpeg": 2,
+}
+
+
+class StagePool:
+    def __init__(self, kind: str, workers: int) -> None:
+        self.kind = kind
+        self.workers = workers
+
+        self._queue: PriorityQueue = PriorityQueue()
+        self._sequence = itertools.count()
+        self._threads = [
+            threading.Thread(target=self._work, name=f"reelsmith-{kind}-{i}", daemon=True)
+            for i in range(workers)
+        ]
+
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self) -> None:
+        while True:
+            _, _, task = self._queue.get()
+
+            if task is None:
+                return
+
+            task()
+
+    def submit(self, priority: int, task: Callable[[], None]) -> None:
+        self._queue.put((priority, next(self._sequence), task))
+
+    def shutdown(self) -> None:
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._sequence), None))
+
+        for thread in self._threads:
+            thread.join()
+
+
+class BatchRunner:
+    def __init__(self, stages: list[Stage] = STAGES, workers: dict[str, int] | None = None,
+                 store: CheckpointStore | None = None) -> None:
+        self.stages = checkpoint_stages(stages, store) if store is not None else stages
+
+        workers = {**DEFAULT_WORKERS, **(workers or {})}
+        self.pools = {kind: StagePool(kind, workers[kind]) for kind in {stage.kind for stage in stages}}
+        self.recorders: dict[str, instrumentation.Recorder] = {}
+
+    def _advance(self, state: State, index: int, result: Future, recorder: instrumentation.Recorder) -> None:
+        if index == len(self.stages):
+            result.set_result(state)
+            return
+
+        stage = self.stages[index]
+
+        def task() -> None:
+            try:
+                with instrumentation.recording(recorder):
+                    next_state = state.merged(stage.node(state))
+            except BaseException as e:
+                result.set_exception(e)
+                return
+
+            self._advance(next_state, index + 1, result, recorder)
+
+        # Later stages run first so videos already in flight finish before new ones start.
+        self.pools[stage.kind].submit(-index, task)
+
+    def submit(self, topic: str) -> Future:
+        result = Future()
+        result.set_running_or_notify_cancel()
+
+        recorder = instrumentation.Recorder(run_id=topic)
+        self.recorders[topic] = recorder
+
+        self._advance(State(topic=topic), 0, result, recorder)
+        return result
+
+    def run(self, topics: Iterable[str]) -> list[State | BaseException]:
+        futures = [self.submit(topic) for topic in topics]
+        return [future.exception() or future.result() for future in futures]
+
+    def shutdown(self) -> None:
+        for pool in self.pools.values():
+            pool.shutdown()
+
+    def __enter__(self) -> "BatchRunner":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.shutdown()
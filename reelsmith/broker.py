@@ -0,0 +1,357 @@
+import json
+import shutil
+import socket
+import sqlite3
+import threading
+import time
+import traceback
+import uuid
+
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, Iterable, NamedTuple
+
+from pydantic_core import to_jsonable_python
+
+from reelsmith import instrumentation
+from reelsmith.cache import CACHE_DIR
+from reelsmith.checkpoint import ARTIFACT_FIELDS, run_id_for
+from reelsmith.pipeline import OVERLAPPED_STAGES, STAGES, STREAMED_OVERLAPPED_STAGES, STREAMED_STAGES, Stage
+from reelsmith.stub import State
+
+ARTIFACT_SCHEME = "artifact:"
+
+
+class Task(NamedTuple):
+    id: str
+    run_id: str
+    stage: str
+    payload: dict[str, Any]
+    attempts: int
+
+
+class Handoff(NamedTuple):
+    stage: str
+    payload: dict[str, Any]
+    priority: int = 0
+
+
+class Broker(ABC):
+    """Queue of stage tasks shared by the dispatcher and the stage workers."""
+
+    @abstractmethod
+    def put(self, run_id: str, stage: str, payload: dict[str, Any], priority: int = 0) -> str:
+        ...
+
+    @abstractmethod
+    def claim(self, stages: Iterable[str], worker: str, lease: float, max_attempts: int = 3) -> Task | None:
+        """
+        Take the highest-priority queued task for one of ``stages``, or one whose lease has expired. Expired tasks
+        that already had ``max_attempts`` attempts are marked failed instead.
+        """
+
+    # extend, complete and fail only apply while ``worker`` still holds the task's lease, and return whether it did.
+
+    @abstractmethod
+    def extend(self, task_id: str, worker: str, lease: float) -> bool:
+        ...
+
+    @abstractmethod
+    def complete(self, task_id: str, worker: str, result: dict[str, Any], handoff: Handoff | None = None) -> bool:
+        """Mark the task done and queue ``handoff`` (the run's next stage) in one step."""
+
+    @abstractmethod
+    def fail(self, task_id: str, worker: str, error: str, retry: bool) -> bool:
+        ...
+
+    @abstractmethod
+    def status(self, run_id: str) -> dict[str, Any] | None:
+        """The most recent task of a run: its stage, status, error and (once done) result."""
+
+
+class SQLiteBroker(Broker):
+    """Broker backed by one SQLite file, for a single machine, a shared volume or tests."""
+
+    def __init__(self, path: Path = CACHE_DIR / "broker.sqlite3") -> None:
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS tasks (
+                id TEXT PRIMARY KEY,
+                run_id TEXT NOT NULL,
+                stage TEXT NOT NULL,
+                priority INTEGER NOT NULL,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                worker TEXT,
+                leased_until REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tasks_queue ON tasks (status, stage, priority)")
+        self._connection.execute("CREATE INDEX IF NOT EXISTS tasks_run ON tasks (run_id, created_at)")
+
+    def _insert(self, run_id: str, stage: str, payload: dict[str, Any], priority: int) -> str:
+        task_id = uuid.uuid4().hex
+        now = time.time()
+
+        self._connection.execute(
+            "INSERT INTO tasks (id, run_id, stage, priority, payload, status, created_at, updated_at) "
+            "VALUES (?, ?, ?, ?, ?, 'queued', ?, ?)",
+            (task_id, run_id, stage, priority, json.dumps(payload), now, now))
+
+        return task_id
+
+    def put(self, run_id: str, stage: str, payload: dict[str, Any], priority: int = 0) -> str:
+        with self._lock:
+            return self._insert(run_id, stage, payload, priority)
+
+    def claim(self, stages: Iterable[str], worker: str, lease: float, max_attempts: int = 3) -> Task | None:
+        stages = list(stages)
+        placeholders = ", ".join("?" for _ in stages)
+        now = time.time()
+
+        with self._lock:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers can't claim the same row.
+            self._connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                # A task that keeps outliving its lease (e.g. it crashes or stalls its worker) would otherwise be
+                # claimed again forever.
+                self._connection.execute(
+                    f"UPDATE tasks SET status = 'failed', error = 'Lease expired after ' || attempts || ' attempts', "
+                    f"leased_until = NULL, updated_at = ? "
+                    f"WHERE stage IN ({placeholders}) AND status = 'running' AND leased_until < ? AND attempts >= ?",
+                    (now, *stages, now, max_attempts))
+
+                row = self._connection.execute(
+                    f"SELECT id, run_id, stage, payload, attempts FROM tasks "
+                    f"WHERE stage IN ({placeholders}) "
+                    f"AND (status = 'queued' OR (status = 'running' AND leased_until < ?)) "
+                    f"ORDER BY priority DESC, created_at ASC LIMIT 1",
+                    (*stages, now)).fetchone()
+
+                if row is not None:
+                    self._connection.execute(
+                        "UPDATE tasks SET status = 'running', worker = ?, leased_until = ?, attempts = attempts + 1, "
+                        "updated_at = ? WHERE id = ?",
+                        (worker, now + lease, now, row[0]))
+
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        if row is None:
+            return None
+
+        return Task(id=row[0], run_id=row[1], stage=row[2], payload=json.loads(row[3]), attempts=row[4] + 1)
+
+    def extend(self, task_id: str, worker: str, lease: float) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE tasks SET leased_until = ? WHERE id = ? AND worker = ? AND status = 'running'",
+                (time.time() + lease, task_id, worker))
+
+        return cursor.rowcount == 1
+
+    def complete(self, task_id: str, worker: str, result: dict[str, Any], handoff: Handoff | None = None) -> bool:
+        with self._lock:
+            self._connection.execute("BEGIN IMMEDIATE")
+
+            try:
+                cursor = self._connection.execute(
+                    "UPDATE tasks SET status = 'done', result = ?, leased_until = NULL, updated_at = ? "
+                    "WHERE id = ? AND worker = ? AND status = 'running'",
+                    (json.dumps(result), time.time(), task_id, worker))
+
+                completed = cursor.rowcount == 1
+                if completed and handoff is not None:
+                    run_id = self._connection.execute("SELECT run_id FROM tasks WHERE id = ?", (task_id,)).fetchone()[0]
+                    self._insert(run_id, handoff.stage, handoff.payload, handoff.priority)
+
+                self._connection.execute("COMMIT")
+            except BaseException:
+                self._connection.execute("ROLLBACK")
+                raise
+
+        return completed
+
+    def fail(self, task_id: str, worker: str, error: str, retry: bool) -> bool:
+        with self._lock:
+            cursor = self._connection.execute(
+                "UPDATE tasks SET status = ?, error = ?, worker = NULL, leased_until = NULL, updated_at = ? "
+                "WHERE id = ? AND worker = ? AND status = 'running'",
+                ("queued" if retry else "failed", error, time.time(), task_id, worker))
+
+        return cursor.rowcount == 1
+
+    def status(self, run_id: str) -> dict[str, Any] | None:
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT stage, status, attempts, error, result FROM tasks WHERE run_id = ? "
+                "ORDER BY created_at DESC LIMIT 1", (run_id,)).fetchone()
+
+        if row is None:
+            return None
+
+        return {
+            "stage": row[0],
+            "status": row[1],
+            "attempts": row[2],
+            "error": row[3],
+            "result": json.loads(row[4]) if row[4] is not None else None,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
+
+
+class ArtifactStore:
+    """
+    Directory shared by all workers (e.g. a network mount). Artifacts produced by a stage are moved in here and
+    passed between stages as ``artifact:<name>`` references instead of machine-local paths.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR / "artifacts") -> None:
+        self.root = Path(root)
+        self.root.mkdir(parents=True, exist_ok=True)
+
+    def publish(self, run_id: str, update: dict[str, Any]) -> dict[str, Any]:
+        published = dict(update)
+
+        for field in ARTIFACT_FIELDS:
+            path = update.get(field)
+
+            if path is None or str(path).startswith(ARTIFACT_SCHEME):
+                continue
+
+            name = f"{run_id}-{field}-{uuid.uuid4().hex[:8]}{Path(path).suffix}"
+            shutil.move(str(path), self.root / name)
+            published[field] = ARTIFACT_SCHEME + name
+
+        return published
+
+    def resolve(self, state: dict[str, Any]) -> dict[str, Any]:
+        resolved = dict(state)
+
+        for field in ARTIFACT_FIELDS:
+            value = state.get(field)
+
+            if isinstance(value, str) and value.startswith(ARTIFACT_SCHEME):
+                resolved[field] = self.root / value[len(ARTIFACT_SCHEME):]
+
+        return resolved
+
+
+def stage_registry() -> dict[str, Stage]:
+    return {stage.name: stage for stages in (STAGES, OVERLAPPED_STAGES, STREAMED_STAGES, STREAMED_OVERLAPPED_STAGES)
+            for stage in stages}
+
+
+class Dispatcher:
+    def __init__(self, broker: Broker, stages: list[Stage] = STAGES) -> None:
+        self.broker = broker
+        self.stages = [stage.name for stage in stages]
+
+    def submit(self, topic: str, run_id: str | None = None) -> str:
+        run_id = run_id if run_id is not None else run_id_for(topic)
+        payload = {"stages": self.stages, "index": 0, "state": {"topic": topic}}
+        self.broker.put(run_id, self.stages[0], payload, priority=0)
+        return run_id
+
+    def wait(self, run_id: str, poll_interval: float = 1.0, timeout: float | None = None) -> dict[str, Any]:
+        deadline = time.monotonic() + timeout if timeout is not None else None
+
+        while True:
+            status = self.broker.status(run_id)
+
+            if status is not None and (status["status"] == "failed" or
+                                       (status["status"] == "done" and status["stage"] == self.stages[-1])):
+                return status
+
+            if deadline is not None and time.monotonic() >= deadline:
+                raise TimeoutError(f"Run {run_id} did not finish in time")
+
+            time.sleep(poll_interval)
+
+
+class StageWorker:
+    """Runs the tasks of some stages only, so e.g. TTS and caption workers can scale apart from LLM-bound ones."""
+
+    def __init__(self, broker: Broker, artifacts: ArtifactStore, stages: Iterable[str], lease: float = 600,
+                 max_attempts: int = 3, poll_interval: float = 1.0, worker_id: str | None = None) -> None:
+        registry = stage_registry()
+        unknown = set(stages) - set(registry)
+        if unknown:
+            raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+
+        self.broker = broker
+        self.artifacts = artifacts
+        self.stages = {name: registry[name] for name in stages}
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.poll_interval = poll_interval
+        self.worker_id = worker_id if worker_id is not None else f"{socket.gethostname()}-{uuid.uuid4().hex[:6]}"
+
+        self.recorder = instrumentation.Recorder(run_id=self.worker_id)
+
+    def _heartbeat(self, task: Task, done: threading.Event) -> None:
+        while not done.wait(self.lease / 3):
+            if not self.broker.extend(task.id, self.worker_id, self.lease):
+                # The lease was lost to another worker; this worker's result will be discarded.
+                return
+
+    def _execute(self, task: Task) -> None:
+        stage = self.stages[task.stage]
+        state_json = task.payload["state"]
+        state = State(**self.artifacts.resolve(state_json))
+
+        update = self.artifacts.publish(task.run_id, to_jsonable_python(stage.node(state)))
+        state_json = {**state_json, **update}
+
+        index = task.payload["index"] + 1
+        pipeline = task.payload["stages"]
+
+        handoff = None
+        if index < len(pipeline):
+            handoff = Handoff(pipeline[index], {**task.payload, "index": index, "state": state_json}, priority=index)
+
+        if not self.broker.complete(task.id, self.worker_id, {"state": state_json}, handoff):
+            instrumentation.count("broker.leases_lost")
+
+    def run_once(self) -> bool:
+        task = self.broker.claim(self.stages, self.worker_id, self.lease, self.max_attempts)
+        if task is None:
+            return False
+
+        done = threading.Event()
+        threading.Thread(target=self._heartbeat, args=(task, done), daemon=True).start()
+
+        with instrumentation.recording(self.recorder):
+            try:
+                self._execute(task)
+            except Exception as e:
+                error = "".join(traceback.format_exception_only(e)).strip()
+                self.broker.fail(task.id, self.worker_id, error, retry=task.attempts < self.max_attempts)
+                instrumentation.count("broker.task_errors")
+            finally:
+                done.set()
+
+        return True
+
+    def run(self, stop: threading.Event | None = None) -> None:
+        stop = stop if stop is not None else threading.Event()
+
+        while not stop.is_set():
+            if not self.run_once():
+                stop.wait(self.poll_interval)
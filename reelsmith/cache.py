@@ -0,0 +1,111 @@
+import hashlib
+import sqlite3
+import threading
+import time
+
+from pathlib import Path
+
+CACHE_DIR = Path.home() / ".cache" / "reelsmith"
+
+
+class SQLiteCache:
+    def __init__(self, path: Path, ttl: float | None = None, max_bytes: int | None = None) -> None:
+        self.path = Path(path)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                value BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                created_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self._connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+        self._connection.commit()
+
+    @staticmethod
+    def key(*parts: str | bytes) -> str:
+        digest = hashlib.sha256()
+
+        for part in parts:
+            digest.update(part if isinstance(part, bytes) else part.encode())
+            digest.update(b"\0")
+
+        return digest.hexdigest()
+
+    def _expired(self, created_at: float) -> bool:
+        return self.ttl is not None and time.time() - created_at > self.ttl
+
+    def get_entry(self, key: str) -> tuple[bytes, float] | None:
+        with self._lock:
+            row = self._connection.execute("SELECT value, created_at FROM entries WHERE key = ?",
+                                           (key,)).fetchone()
+            if row is None:
+                return None
+
+            self._connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (time.time(), key))
+            self._connection.commit()
+
+        return row[0], row[1]
+
+    def get(self, key: str) -> bytes | None:
+        entry = self.get_entry(key)
+
+        if entry is None or self._expired(entry[1]):
+            return None
+
+        return entry[0]
+
+    def is_fresh(self, created_at: float) -> bool:
+        return not self._expired(created_at)
+
+    def set(self, key: str, value: bytes) -> None:
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO entries (key, value, size, created_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (key, value, len(value), now, now))
+            self._evict()
+            self._connection.commit()
+
+    def touch(self, key: str) -> None:
+        now = time.time()
+
+        with self._lock:
+            self._connection.execute("UPDATE entries SET created_at = ?, accessed_at = ? WHERE key = ?",
+                                     (now, now, key))
+            self._connection.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            self._connection.commit()
+
+    def _evict(self) -> None:
+        if self.max_bytes is None:
+            return
+
+        total = self._connection.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+
+        for key, size in self._connection.execute(
+                "SELECT key, size FROM entries ORDER BY accessed_at ASC").fetchall():
+            if total <= self.max_bytes:
+                break
+
+            self._connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
+
+    def close(self) -> None:
+        with self._lock:
+            self._connection.close()
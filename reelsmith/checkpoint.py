@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+import time
+
+from pathlib import Path
+from typing import Any, Callable
+
+from pydantic_core import to_jsonable_python
+
+from reelsmith import instrumentation
+from reelsmith.cache import CACHE_DIR
+from reelsmith.stub import State
+
+ARTIFACT_FIELDS = ("final_audio_path", "caption_path", "video_path")
+
+logger = logging.getLogger(__name__)
+
+
+def run_id_for(topic: str) -> str:
+    slug = re.sub(r"[^a-z0-9]+", "-", topic.lower()).strip("-")[:48]
+    return f"{slug}-{hashlib.sha256(topic.encode()).hexdigest()[:8]}"
+
+
+def input_hash(state: State) -> str:
+    return hashlib.sha256(state.model_dump_json().encode()).hexdigest()
+
+
+class CheckpointStore:
+    """
+    Stage outputs keyed by run id, so a rerun resumes after the last finished stage. Checkpoints older than
+    ``max_age`` seconds are ignored, so rerunning a topic later researches and renders it again.
+    """
+
+    def __init__(self, root: Path = CACHE_DIR / "checkpoints", max_age: float | None = 24 * 60 * 60) -> None:
+        self.root = Path(root)
+        self.max_age = max_age
+
+    def _path(self, run_id: str, node: str) -> Path:
+        return self.root / run_id / f"{node}.json"
+
+    @staticmethod
+    def _artifacts_exist(output: dict[str, Any]) -> bool:
+        return all(output.get(field) is None or Path(output[field]).exists() for field in ARTIFACT_FIELDS)
+
+    def _expired(self, checkpoint: dict[str, Any]) -> bool:
+        return self.max_age is not None and time.time() - checkpoint.get("created_at", 0) > self.max_age
+
+    def load(self, run_id: str, node: str, state_hash: str) -> tuple[dict[str, Any], float] | None:
+        """The checkpointed output and when it was saved, or None if it is missing, stale or expired."""
+        path = self._path(run_id, node)
+
+        try:
+            checkpoint = json.loads(path.read_text())
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+
+        if checkpoint.get("input_hash") != state_hash or self._expired(checkpoint) \
+                or not self._artifacts_exist(checkpoint["output"]):
+            return None
+
+        return checkpoint["output"], checkpoint["created_at"]
+
+    def save(self, run_id: str, node: str, state_hash: str, output: dict[str, Any]) -> None:
+        path = self._path(run_id, node)
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        with tempfile.NamedTemporaryFile("w", dir=path.parent, suffix=".tmp", delete=False) as f:
+            json.dump({"input_hash": state_hash, "created_at": time.time(), "output": to_jsonable_python(output)}, f)
+
+        os.replace(f.name, path)
+
+    def clear(self, run_id: str) -> None:
+        for path in (self.root / run_id).glob("*.json"):
+            path.unlink(missing_ok=True)
+
+
+def checkpointed(store: CheckpointStore, run_id: str | Callable[[State], str], name: str,
+                 node: Callable[[State], dict]) -> Callable[[State], dict]:
+    def wrapper(state: State) -> dict:
+        key = run_id(state) if callable(run_id) else run_id
+        state_hash = input_hash(state)
+
+        entry = store.load(key, name, state_hash)
+        if entry is not None:
+            output, created_at = entry
+            logger.info("Skipping %s for %s: reusing its checkpoint from %s",
+                        name, key, time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(created_at)))
+            instrumentation.count("checkpoint.hits")
+            return output
+
+        output = node(state)
+        store.save(key, name, state_hash, output)
+        return output
+
+    return wrapper
@@ -0,0 +1,157 @@
+import math
+import re
+import zlib
+
+from collections import Counter
+
+import numpy as np
+
+from reelsmith.stub import State
+
+SENTENCE_PATTERN = re.compile(r"(?<=[.!?])\s+(?=[\"'(\[]?[A-Z0-9])")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+# Mersenne prime used by the universal hash family of the MinHash permutations.
+_PRIME = (1 << 61) - 1
+
+
+def split_sentences(text: str) -> list[str]:
+    return [sentence.strip() for sentence in SENTENCE_PATTERN.split(text) if sentence.strip()]
+
+
+def tokenize(text: str) -> list[str]:
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def estimate_tokens(text: str, chars_per_token: float = 4.0) -> int:
+    return max(1, math.ceil(len(text) / chars_per_token))
+
+
+class ResearchCompressor:
+    def __init__(self,
+                 token_budget: int = 1500,
+                 chars_per_token: float = 4.0,
+                 shingle_size: int = 3,
+                 num_perm: int = 64,
+                 bands: int = 16,
+                 threshold: float = 0.7,
+                 damping: float = 0.85,
+                 iterations: int = 50,
+                 min_words: int = 4,
+                 seed: int = 0) -> None:
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+
+        self.token_budget = token_budget
+        self.chars_per_token = chars_per_token
+        self.shingle_size = shingle_size
+        self.bands = bands
+        self.threshold = threshold
+        self.damping = damping
+        self.iterations = iterations
+        self.min_words = min_words
+
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def _shingles(self, tokens: list[str]) -> np.ndarray:
+        size = min(self.shingle_size, len(tokens))
+        shingles = {zlib.crc32(" ".join(tokens[i:i + size]).encode()) for i in range(len(tokens) - size + 1)}
+        return np.fromiter(shingles, dtype=np.uint64, count=len(shingles))
+
+    def _signature(self, tokens: list[str]) -> np.ndarray:
+        shingles = self._shingles(tokens)
+        # Shingle hashes are 32-bit and the coefficients below 2**61, so products can wrap; the wrapped
+        # values are still a fixed pseudo-random permutation family, which is all MinHash needs.
+        hashed = (np.outer(shingles, self._a) + self._b) % np.uint64(_PRIME)
+        return hashed.min(axis=0)
+
+    def deduplicate(self, sentences: list[list[str]]) -> list[int]:
+        """Return the indices of sentences kept after dropping near duplicates of earlier ones."""
+        signatures = [self._signature(tokens) for tokens in sentences]
+        rows = len(self._a) // self.bands
+        buckets: dict[tuple[int, bytes], list[int]] = {}
+        kept = []
+
+        for i, signature in enumerate(signatures):
+            keys = [(band, signature[band * rows:(band + 1) * rows].tobytes()) for band in range(self.bands)]
+            candidates = {j for key in keys for j in buckets.get(key, [])}
+
+            if any(np.mean(signatures[j] == signature) >= self.threshold for j in candidates):
+                continue
+
+            kept.append(i)
+            for key in keys:
+                buckets.setdefault(key, []).append(i)
+
+        return kept
+
+    def rank(self, sentences: list[list[str]]) -> np.ndarray:
+        """TextRank over TF-IDF cosine similarity between sentences."""
+        count = len(sentences)
+        if count <= 1:
+            return np.ones(count)
+
+        vocabulary: dict[str, int] = {}
+        document_frequency = Counter(token for tokens in sentences for token in set(tokens))
+        idf = {token: math.log(count / frequency) + 1 for token, frequency in document_frequency.items()}
+
+        vectors = np.zeros((count, len(document_frequency)))
+        for i, tokens in enumerate(sentences):
+            for token, frequency in Counter(tokens).items():
+                vectors[i, vocabulary.setdefault(token, len(vocabulary))] = frequency * idf[token]
+
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        vectors /= np.where(norms == 0, 1, norms)
+
+        similarity = vectors @ vectors.T
+        np.fill_diagonal(similarity, 0)
+
+        totals = similarity.sum(axis=1, keepdims=True)
+        transition = np.divide(similarity, totals, out=np.full_like(similarity, 1 / count), where=totals > 0)
+
+        scores = np.full(count, 1 / count)
+        for _ in range(self.iterations):
+            updated = (1 - self.damping) / count + self.damping * transition.T @ scores
+
+            if np.abs(updated - scores).sum() < 1e-6:
+                return updated
+
+            scores = updated
+
+        return scores
+
+    def pack(self, sentences: list[str], scores: np.ndarray) -> list[str]:
+        """Greedily take the best sentences that fit the token budget, keeping their original order."""
+        chosen = []
+        remaining = self.token_budget
+
+        for i in np.argsort(-scores, kind="stable"):
+            tokens = estimate_tokens(sentences[i], self.chars_per_token)
+
+            if tokens <= remaining:
+                chosen.append(i)
+                remaining -= tokens
+
+        return [sentences[i] for i in sorted(chosen)]
+
+    def compress(self, summaries: list[str]) -> str:
+        sentences = []
+
+        for summary in summaries:
+            for sentence in split_sentences(summary):
+                if len(tokenize(sentence)) >= self.min_words:
+                    sentences.append(sentence)
+
+        tokens = [tokenize(sentence) for sentence in sentences]
+        kept = self.deduplicate(tokens)
+
+        sentences = [sentences[i] for i in kept]
+        scores = self.rank([tokens[i] for i in kept])
+
+        return " ".join(self.pack(sentences, scores))
+
+    def compress_research(self, state: State) -> State:
+        state.research_context = self.compress([summary for summary in state.search_summary or [] if summary])
+        return state
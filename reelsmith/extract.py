@@ -0,0 +1,51 @@
+from html.parser import HTMLParser
+
+SKIPPED_TAGS = {"script", "style", "noscript", "template"}
+
+
+class ParagraphExtractor(HTMLParser):
+    def __init__(self, max_chars: int | None = None) -> None:
+        super().__init__(convert_charrefs=True)
+        self.max_chars = max_chars
+        self.chars = 0
+
+        self._in_paragraph = False
+        self._skipped = 0
+        self._paragraphs: list[str] = []
+        self._current: list[str] = []
+
+    @property
+    def done(self) -> bool:
+        return self.max_chars is not None and self.chars >= self.max_chars
+
+    def _close_paragraph(self) -> None:
+        if self._current:
+            self._paragraphs.append("".join(self._current))
+            self._current = []
+
+        self._in_paragraph = False
+
+    def handle_starttag(self, tag: str, attrs: list[tuple[str, str | None]]) -> None:
+        if tag in SKIPPED_TAGS:
+            self._skipped += 1
+        elif tag == "p":
+            self._close_paragraph()
+            self._in_paragraph = True
+
+    def handle_endtag(self, tag: str) -> None:
+        if tag in SKIPPED_TAGS:
+            self._skipped = max(0, self._skipped - 1)
+        elif tag == "p":
+            self._close_paragraph()
+
+    def handle_data(self, data: str) -> None:
+        if not self._in_paragraph or self._skipped or self.done:
+            return
+
+        self._current.append(data)
+        self.chars += len(data)
+
+    def text(self) -> str:
+        paragraphs = self._paragraphs + (["".join(self._current)] if self._current else [])
+        text = ' '.join(paragraphs).strip().replace('\n', ' ')
+        return text[:self.max_chars] if self.max_chars is not None else text
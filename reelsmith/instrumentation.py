@@ -0,0 +1,208 @@
+import functools
+import inspect
+import json
+import platform
+import re
+import resource
+import threading
+import time
+
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Callable, Iterator
+
+_current: ContextVar["Recorder | None"] = ContextVar("reelsmith_recorder", default=None)
+
+
+def peak_rss_bytes() -> int:
+    """Highest resident set size of this process since it started, not of any one span."""
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if platform.system() == "Darwin" else peak * 1024
+
+
+class Recorder:
+    def __init__(self, run_id: str | None = None) -> None:
+        self.run_id = run_id
+        self.spans: list[dict[str, Any]] = []
+        self.counters: dict[str, float] = {}
+        self.gauges: dict[str, float] = {}
+
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(self, name: str, **attributes: Any) -> Iterator[dict[str, Any]]:
+        """
+        Time a block. ``cpu_seconds`` is the CPU time of the calling thread only, so it leaves out work handed to
+        pools but includes other coroutines sharing an event loop; ``process_cpu_seconds`` covers every thread,
+        including other concurrent jobs.
+        """
+        record = {"name": name, **attributes}
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        process_cpu_start = time.process_time()
+
+        try:
+            yield record
+        except BaseException as e:
+            record["error"] = type(e).__name__
+            raise
+        finally:
+            record["wall_seconds"] = time.perf_counter() - wall_start
+            record["cpu_seconds"] = time.thread_time() - cpu_start
+            record["process_cpu_seconds"] = time.process_time() - process_cpu_start
+            record["process_peak_rss_bytes"] = peak_rss_bytes()
+
+            with self._lock:
+                self.spans.append(record)
+
+    def count(self, name: str, value: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def gauge(self, name: str, value: float) -> None:
+        """Record a point-in-time value, such as a latency; unlike a counter, a later value replaces the earlier."""
+        with self._lock:
+            self.gauges[name] = value
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        summary: dict[str, dict[str, float]] = {}
+
+        with self._lock:
+            for record in self.spans:
+                stats = summary.setdefault(record["name"], {"count": 0, "wall_seconds": 0.0, "cpu_seconds": 0.0,
+                                                            "errors": 0})
+                stats["count"] += 1
+                stats["wall_seconds"] += record["wall_seconds"]
+                stats["cpu_seconds"] += record["cpu_seconds"]
+                stats["errors"] += "error" in record
+
+        return summary
+
+    def to_dict(self) -> dict[str, Any]:
+        with self._lock:
+            spans = list(self.spans)
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        return {
+            "run_id": self.run_id,
+            "peak_rss_bytes": peak_rss_bytes(),
+            "counters": counters,
+            "gauges": gauges,
+            "summary": self.summary(),
+            "spans": spans,
+        }
+
+    def to_json(self, **kwargs: Any) -> str:
+        return json.dumps(self.to_dict(), default=str, **kwargs)
+
+    @staticmethod
+    def _metric_name(name: str) -> str:
+        return re.sub(r"[^a-zA-Z0-9_]", "_", name)
+
+    @staticmethod
+    def _label(value: Any) -> str:
+        return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+    def to_prometheus(self) -> str:
+        run = f'run="{self._label(self.run_id)}"' if self.run_id is not None else ""
+        labels = f"{{{run}}}" if run else ""
+        lines = [
+            "# TYPE reelsmith_peak_rss_bytes gauge",
+            f"reelsmith_peak_rss_bytes{labels} {peak_rss_bytes()}",
+        ]
+
+        summary = self.summary()
+        for metric in ("count", "wall_seconds", "cpu_seconds", "errors"):
+            lines.append(f"# TYPE reelsmith_span_{metric}_total counter")
+
+            for name, stats in summary.items():
+                span_labels = ",".join(filter(None, [f'span="{self._label(name)}"', run]))
+                lines.append(f"reelsmith_span_{metric}_total{{{span_labels}}} {stats[metric]}")
+
+        with self._lock:
+            counters = dict(self.counters)
+            gauges = dict(self.gauges)
+
+        for name, value in counters.items():
+            metric = f"reelsmith_{self._metric_name(name)}_total"
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{labels} {value}")
+
+        for name, value in gauges.items():
+            metric = f"reelsmith_{self._metric_name(name)}"
+            lines.append(f"# TYPE {metric} gauge")
+            lines.append(f"{metric}{labels} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+def current() -> Recorder | None:
+    return _current.get()
+
+
+@contextmanager
+def recording(recorder: Recorder | None) -> Iterator[Recorder | None]:
+    token = _current.set(recorder)
+
+    try:
+        yield recorder
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def span(name: str, **attributes: Any) -> Iterator[dict[str, Any]]:
+    recorder = current()
+
+    if recorder is None:
+        yield {}
+        return
+
+    with recorder.span(name, **attributes) as record:
+        yield record
+
+
+def count(name: str, value: float = 1) -> None:
+    recorder = current()
+
+    if recorder is not None:
+        recorder.count(name, value)
+
+
+def gauge(name: str, value: float) -> None:
+    recorder = current()
+
+    if recorder is not None:
+        recorder.gauge(name, value)
+
+
+def bind(fn: Callable) -> Callable:
+    recorder = current()
+
+    @functools.wraps(fn)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        with recording(recorder):
+            return fn(*args, **kwargs)
+
+    return wrapper
+
+
+def instrumented(name: str) -> Callable[[Callable], Callable]:
+    def decorator(fn: Callable) -> Callable:
+        if inspect.iscoroutinefunction(fn):
+            @functools.wraps(fn)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with span(name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with span(name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
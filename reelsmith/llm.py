@@ -1,70 +1,641 @@
-from typing import Sequence, Any
+import asyncio
+import collections
+import copy
+import itertools
+import json
+import random
+import threading
+import time
 
-from langchain_core.language_models import BaseChatModel
-from langchain_core.messages import BaseMessage
-from langchain_core.prompt_values import PromptValue
-from langchain_core.runnables import RunnableConfig
-from langchain_google_genai.chat_models import ChatGoogleGenerativeAI
-from langchain_ollama.chat_models import ChatOllama
+from concurrent.futures import Future
+from contextlib import aclosing
+from typing import TYPE_CHECKING, AsyncGenerator, AsyncIterator, Awaitable, Callable, Iterator, Sequence, Any
+
+from pydantic import BaseModel
+
+from reelsmith import instrumentation
+from reelsmith.backends import backends
+from reelsmith.cache import CACHE_DIR, SQLiteCache
+
+if TYPE_CHECKING:
+    from langchain_core.language_models import BaseChatModel
+    from langchain_core.messages import BaseMessage
+    from langchain_core.prompt_values import PromptValue
+    from langchain_core.runnables import Runnable, RunnableConfig
+
+    # langchain_core is otherwise imported inside methods, so importing this module stays cheap.
+    LLMInput = PromptValue | str | Sequence[BaseMessage | list[str] | tuple[str, str] | str | dict[str, Any]]
+
+
+def default_response_cache(ttl: float | None = 7 * 24 * 60 * 60, max_bytes: int = 128 * 1024 ** 2) -> SQLiteCache:
+    return SQLiteCache(CACHE_DIR / "responses.sqlite3", ttl=ttl, max_bytes=max_bytes)
+
+
+# Marks a stream that ended before its first chunk.
+_EMPTY = object()
+
+RETRYABLE_STATUS = {408, 409, 425, 429, 500, 502, 503, 504}
+RETRYABLE_NAMES = ("RateLimit", "ResourceExhausted", "ServiceUnavailable", "Overloaded", "Timeout", "Unavailable",
+                   "InternalServerError", "ConnectError", "RemoteProtocolError")
+
+
+def retryable(error: BaseException) -> bool:
+    if isinstance(error, (TimeoutError, ConnectionError)):
+        return True
+
+    for source in (error, getattr(error, "response", None)):
+        status = getattr(source, "status_code", None) or getattr(source, "code", None)
+        if isinstance(status, int) and status in RETRYABLE_STATUS:
+            return True
+
+    return any(name in type(error).__name__ for name in RETRYABLE_NAMES)
+
+
+class LeaderCancelled(Exception):
+    """The call a request was coalesced onto was cancelled, so the request has to be issued again."""
+
+
+class ConcurrencyController:
+    """
+    Process-wide limiter for one LLM backend.
+
+    The concurrency limit grows additively while calls succeed and halves when the backend signals overload
+    (AIMD). Retryable failures are retried with full-jitter exponential backoff until ``deadline`` seconds have
+    passed, and identical in-flight requests are coalesced onto the first one. Each coalesced request gets its own
+    copy of the response, and if the first one is cancelled, the next to retry takes its place. Synchronous attempts
+    can't be interrupted, so for ``call`` the deadline is enforced while waiting for a slot and between attempts.
+    """
+
+    def __init__(self,
+                 name: str,
+                 initial_limit: int = 8,
+                 min_limit: int = 1,
+                 max_limit: int = 64,
+                 decrease: float = 0.5,
+                 max_attempts: int = 5,
+                 base_delay: float = 0.5,
+                 max_delay: float = 30.0,
+                 deadline: float = 300.0) -> None:
+        self.name = name
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.decrease = decrease
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.deadline = deadline
+
+        self.in_flight = 0
+
+        self._condition = threading.Condition()
+        self._waiters: collections.deque[tuple[asyncio.AbstractEventLoop, asyncio.Future]] = collections.deque()
+        self._pending: dict[str, Future] = {}
+
+    def _try_acquire(self) -> bool:
+        with self._condition:
+            if self.in_flight < int(self.limit):
+                self.in_flight += 1
+                return True
+
+            return False
+
+    def _acquire(self, deadline_at: float) -> None:
+        with self._condition:
+            while self.in_flight >= int(self.limit):
+                remaining = deadline_at - time.monotonic()
+                if remaining <= 0:
+                    raise TimeoutError(f"No {self.name} slot became free before the deadline")
+
+                self._condition.wait(remaining)
+
+            self.in_flight += 1
+
+    @staticmethod
+    def _wake_waiter(waiter: asyncio.Future) -> None:
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _wake(self) -> None:
+        # Called with the condition held. Wake one queued coroutine per free slot; a woken coroutine still has to
+        # take the slot itself, so a thread that gets there first just sends it back to the queue.
+        free = int(self.limit) - self.in_flight
+
+        while free > 0 and self._waiters:
+            loop, waiter = self._waiters.popleft()
+
+            try:
+                loop.call_soon_threadsafe(self._wake_waiter, waiter)
+            except RuntimeError:
+                # The waiter's event loop has been closed.
+                continue
+
+            free -= 1
+
+    async def _aacquire(self, deadline_at: float) -> None:
+        """Wait for a slot on the event loop itself rather than parking an executor thread per waiter."""
+        if self._try_acquire():
+            return
+
+        instrumentation.count("llm.queued")
+        loop = asyncio.get_running_loop()
+
+        while True:
+            with self._condition:
+                if self.in_flight < int(self.limit):
+                    self.in_flight += 1
+                    return
+
+                entry = (loop, loop.create_future())
+                self._waiters.append(entry)
+
+            try:
+                async with asyncio.timeout(deadline_at - time.monotonic()):
+                    await entry[1]
+            except BaseException as e:
+                with self._condition:
+                    if entry in self._waiters:
+                        self._waiters.remove(entry)
+                    else:
+                        # Already woken for a free slot it will never take, so pass the wake-up on.
+                        self._wake()
+
+                if isinstance(e, TimeoutError):
+                    raise TimeoutError(f"No {self.name} slot became free before the deadline") from None
+
+                raise
+
+    def _release(self, error: BaseException | None) -> None:
+        with self._condition:
+            self.in_flight -= 1
+
+            if error is None:
+                # Roughly +1 per limit's worth of successful calls.
+                self.limit = min(self.max_limit, self.limit + 1 / self.limit)
+            elif retryable(error):
+                self.limit = max(self.min_limit, self.limit * self.decrease)
+                instrumentation.count("llm.throttled")
+
+            self._condition.notify_all()
+            self._wake()
+
+    def _backoff(self, attempt: int, error: BaseException, deadline_at: float) -> float:
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+        if attempt + 1 >= self.max_attempts or not retryable(error) or time.monotonic() + delay >= deadline_at:
+            raise error
+
+        instrumentation.count("llm.retries")
+        return delay
+
+    def stream(self, open_stream: Callable[[], Iterator[Any]], deadline: float | None = None) -> Iterator[Any]:
+        """
+        Yield the chunks of ``open_stream()`` while holding one slot. Attempts that fail before their first chunk are
+        retried like ``call``; chunks already passed on can't be taken back, so later errors are raised as they are.
+        Streams are consumed as they arrive and never coalesced.
+        """
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+        for attempt in itertools.count():
+            self._acquire(deadline_at)
+
+            try:
+                chunks = open_stream()
+                first = next(chunks, _EMPTY)
+            except Exception as e:
+                self._release(e)
+                time.sleep(self._backoff(attempt, e, deadline_at))
+                continue
+            except BaseException as e:
+                self._release(e)
+                raise
+
+            error = None
+            try:
+                if first is not _EMPTY:
+                    yield first
+                    yield from chunks
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._release(error)
+
+            return
+
+    async def astream(self, open_stream: Callable[[], AsyncGenerator[Any, None]],
+                      deadline: float | None = None) -> AsyncIterator[Any]:
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+        for attempt in itertools.count():
+            await self._aacquire(deadline_at)
+
+            try:
+                chunks = open_stream()
+                async with asyncio.timeout(deadline_at - time.monotonic()):
+                    first = await anext(chunks, _EMPTY)
+            except Exception as e:
+                self._release(e)
+                await asyncio.sleep(self._backoff(attempt, e, deadline_at))
+                continue
+            except BaseException as e:
+                self._release(e)
+                raise
+
+            error = None
+            try:
+                async with aclosing(chunks):
+                    if first is not _EMPTY:
+                        yield first
+
+                        async for chunk in chunks:
+                            yield chunk
+            except BaseException as e:
+                error = e
+                raise
+            finally:
+                self._release(error)
+
+            return
+
+    def _join(self, key: str) -> tuple[Future, bool]:
+        with self._condition:
+            if key in self._pending:
+                return self._pending[key], False
+
+            future = self._pending[key] = Future()
+            return future, True
+
+    def _settle(self, key: str, future: Future, result: Any = None, error: BaseException | None = None) -> None:
+        with self._condition:
+            self._pending.pop(key, None)
+
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def call(self, key: str, fn: Callable[[], Any], deadline: float | None = None) -> Any:
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+
+            instrumentation.count("llm.coalesced")
+
+            try:
+                return copy.deepcopy(future.result(timeout=max(0.0, deadline_at - time.monotonic())))
+            except LeaderCancelled:
+                continue
+
+        try:
+            for attempt in itertools.count():
+                self._acquire(deadline_at)
+
+                try:
+                    result = fn()
+                except Exception as e:
+                    self._release(e)
+                    time.sleep(self._backoff(attempt, e, deadline_at))
+                except BaseException as e:
+                    self._release(e)
+                    raise
+                else:
+                    self._release(None)
+                    break
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        except BaseException as e:
+            # Cancellation (or an interrupt) belongs to the leader alone; the followers retry instead.
+            self._settle(key, future, error=LeaderCancelled(f"Coalesced {self.name} call was cancelled"))
+            raise
+
+        self._settle(key, future, result)
+        return result
+
+    async def acall(self, key: str, fn: Callable[[], Awaitable[Any]], deadline: float | None = None) -> Any:
+        deadline_at = time.monotonic() + (deadline if deadline is not None else self.deadline)
+
+        while True:
+            future, leader = self._join(key)
+            if leader:
+                break
+
+            instrumentation.count("llm.coalesced")
+
+            try:
+                # Shielded so a follower timing out doesn't cancel the leader's shared future.
+                return copy.deepcopy(await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)),
+                                                            max(0.0, deadline_at - time.monotonic())))
+            except LeaderCancelled:
+                # The first follower back becomes the new leader and issues the call itself.
+                continue
+
+        try:
+            for attempt in itertools.count():
+                await self._aacquire(deadline_at)
+
+                try:
+                    result = await asyncio.wait_for(fn(), max(0.0, deadline_at - time.monotonic()))
+                except Exception as e:
+                    self._release(e)
+                    await asyncio.sleep(self._backoff(attempt, e, deadline_at))
+                except BaseException as e:
+                    self._release(e)
+                    raise
+                else:
+                    self._release(None)
+                    break
+        except Exception as e:
+            self._settle(key, future, error=e)
+            raise
+        except BaseException as e:
+            # Cancellation (or an interrupt) belongs to the leader alone; the followers retry instead.
+            self._settle(key, future, error=LeaderCancelled(f"Coalesced {self.name} call was cancelled"))
+            raise
+
+        self._settle(key, future, result)
+        return result
+
+
+_controllers: dict[str, ConcurrencyController] = {}
+_controllers_lock = threading.Lock()
+
+
+def controller_for(backend: str, **kwargs: Any) -> ConcurrencyController:
+    with _controllers_lock:
+        if backend not in _controllers:
+            _controllers[backend] = ConcurrencyController(backend, **kwargs)
+
+        return _controllers[backend]
 
 
 class LLM:
-    def __init__(self, model: str, reasoning: bool = False) -> None:
+    def __init__(self, model: str, reasoning: bool = False, cache: SQLiteCache | None = None,
+                 controller: ConcurrencyController | None = None) -> None:
         self.model: str = model
         self.reasoning: bool = reasoning
+        self.cache: SQLiteCache | None = cache
+        self.controller: ConcurrencyController = controller if controller is not None \
+            else controller_for(type(self).__name__)
+
+        self.llm: "BaseChatModel | None" = None
+        self._structured: dict[Any, "Runnable"] = {}
+
+    def _runnable(self, output_structure: Any = None) -> "Runnable":
+        if self.llm is None:
+            raise ValueError("LLM not initialized")
+
+        if output_structure is None:
+            return self.llm
+
+        if output_structure not in self._structured:
+            self._structured[output_structure] = self.llm.with_structured_output(output_structure)
+
+        return self._structured[output_structure]
+
+    @staticmethod
+    def _serialize_input(input: Any) -> str:
+        from langchain_core.messages import convert_to_messages, message_to_dict
+        from langchain_core.prompt_values import PromptValue
+
+        if isinstance(input, str):
+            return input
+
+        messages = input.to_messages() if isinstance(input, PromptValue) else convert_to_messages(input)
+        return json.dumps([message_to_dict(message) for message in messages], sort_keys=True)
+
+    @staticmethod
+    def _serialize_schema(output_structure: Any) -> str:
+        if output_structure is None:
+            return ""
+
+        if isinstance(output_structure, type) and issubclass(output_structure, BaseModel):
+            return json.dumps(output_structure.model_json_schema(), sort_keys=True)
+
+        return repr(output_structure)
+
+    def _cache_key(self, input: Any, output_structure: Any, stop: list[str] | None, kwargs: dict[str, Any]) -> str:
+        return SQLiteCache.key(
+            type(self).__name__,
+            self.model,
+            str(self.reasoning),
+            self._serialize_input(input),
+            self._serialize_schema(output_structure),
+            json.dumps(stop),
+            json.dumps(kwargs, sort_keys=True, default=repr)
+        )
+
+    @staticmethod
+    def _dump_response(response: Any, output_structure: Any) -> bytes | None:
+        from langchain_core.messages import message_to_dict
+
+        if output_structure is None:
+            return json.dumps(message_to_dict(response)).encode()
+
+        if isinstance(response, BaseModel):
+            return response.model_dump_json().encode()
+
+        return None
+
+    @staticmethod
+    def _load_response(data: bytes, output_structure: Any) -> Any:
+        from langchain_core.messages import messages_from_dict
+
+        if output_structure is None:
+            return messages_from_dict([json.loads(data)])[0]
+
+        return output_structure.model_validate_json(data)
+
+    @staticmethod
+    def _coerce(response: Any, output_structure: Any) -> Any:
+        # Coerce to correct output type if needed
+        if output_structure is not None and isinstance(response, dict):
+            return output_structure(**response)
+        return response
+
+    def _cache_get(self, key: str, output_structure: Any) -> Any:
+        if self.cache is None:
+            return None
+
+        data = self.cache.get(key)
+        return self._load_response(data, output_structure) if data is not None else None
+
+    def _cache_set(self, key: str, response: Any, output_structure: Any) -> None:
+        if self.cache is None:
+            return
+
+        data = self._dump_response(response, output_structure)
+        if data is not None:
+            self.cache.set(key, data)
 
-        self.llm: BaseChatModel | None = None
+    @staticmethod
+    def _content_text(message: Any) -> str:
+        content = getattr(message, "content", "")
+
+        if isinstance(content, str):
+            return content
+
+        return "".join(part.get("text", "") if isinstance(part, dict) else str(part) for part in content)
+
+    @staticmethod
+    def _response_chars(response: Any) -> int:
+        from langchain_core.messages import BaseMessage
+
+        if isinstance(response, BaseMessage) and isinstance(response.content, str):
+            return len(response.content)
+
+        if isinstance(response, BaseModel):
+            return len(response.model_dump_json())
+
+        return 0
+
+    def _record(self, record: dict[str, Any], input: Any, response: Any, cached: bool) -> None:
+        if instrumentation.current() is None:
+            return
+
+        prompt_chars = len(self._serialize_input(input))
+        response_chars = self._response_chars(response)
+
+        record.update(backend=type(self).__name__, model=self.model, cached=cached,
+                      prompt_chars=prompt_chars, response_chars=response_chars)
+
+        instrumentation.count("llm.calls")
+        instrumentation.count("llm.cache_hits", int(cached))
+        instrumentation.count("llm.prompt_chars", prompt_chars)
+        instrumentation.count("llm.response_chars", response_chars)
+
+        usage = getattr(response, "usage_metadata", None)
+        if usage:
+            instrumentation.count("llm.input_tokens", usage.get("input_tokens", 0))
+            instrumentation.count("llm.output_tokens", usage.get("output_tokens", 0))
 
     def invoke(self,
-               input: PromptValue | str | Sequence[BaseMessage | list[str] | tuple[str, str] | str | dict[str, Any]],
+               input: "LLMInput",
                output_structure: Any = None,
-               config: RunnableConfig | None = None,
+               config: "RunnableConfig | None" = None,
                *,
                stop: list[str] | None = None,
                **kwargs: Any) -> Any:
-        if self.llm is None:
-            raise ValueError("LLM not initialized")
+        with instrumentation.span("llm.invoke") as record:
+            runnable = self._runnable(output_structure)
 
-        if output_structure is not None:
-            llm = self.llm.with_structured_output(output_structure)
-            response = llm.invoke(input=input, config=config, stop=stop, **kwargs)
+            # The cache key doubles as the coalescing key for identical in-flight requests.
+            key = self._cache_key(input, output_structure, stop, kwargs)
+            cached = self._cache_get(key, output_structure)
+            if cached is not None:
+                self._record(record, input, cached, True)
+                return cached
 
-            if isinstance(response, dict):
-                return output_structure(**response)
-            return response
+            response = self.controller.call(
+                key, lambda: self._coerce(runnable.invoke(input=input, config=config, stop=stop, **kwargs),
+                                          output_structure))
 
-        return self.llm.invoke(input=input, config=config, stop=stop, **kwargs)
+            self._cache_set(key, response, output_structure)
+            self._record(record, input, response, False)
+            return response
 
     async def ainvoke(self,
-                      input: PromptValue | str | Sequence[
-                          BaseMessage | list[str] | tuple[str, str] | str | dict[str, Any]],
+                      input: "LLMInput",
                       output_structure: Any = None,
-                      config: RunnableConfig | None = None,
+                      config: "RunnableConfig | None" = None,
                       *,
                       stop: list[str] | None = None,
                       **kwargs: Any) -> Any:
-        if self.llm is None:
-            raise ValueError("LLM not initialized")
+        with instrumentation.span("llm.ainvoke") as record:
+            runnable = self._runnable(output_structure)
 
-        if output_structure is not None:
-            llm = self.llm.with_structured_output(output_structure)
-            response = await llm.ainvoke(input=input, config=config, stop=stop, **kwargs)
+            key = self._cache_key(input, output_structure, stop, kwargs)
+            cached = self._cache_get(key, output_structure)
+            if cached is not None:
+                self._record(record, input, cached, True)
+                return cached
 
-            # Coerce to correct output type if needed
-            if isinstance(response, dict):
-                return output_structure(**response)
+            async def attempt() -> Any:
+                return self._coerce(await runnable.ainvoke(input=input, config=config, stop=stop, **kwargs),
+                                    output_structure)
+
+            response = await self.controller.acall(key, attempt)
+
+            self._cache_set(key, response, output_structure)
+            self._record(record, input, response, False)
             return response
 
-        return await self.llm.ainvoke(input=input, config=config, stop=stop, **kwargs)
+    def _finish_stream(self, record: dict[str, Any], input: Any, key: str, chunks: list[str]) -> None:
+        from langchain_core.messages import AIMessage
+
+        response = AIMessage(content="".join(chunks))
+        self._cache_set(key, response, None)
+        self._record(record, input, response, False)
+
+    def stream(self,
+               input: "LLMInput",
+               config: "RunnableConfig | None" = None,
+               *,
+               stop: list[str] | None = None,
+               **kwargs: Any) -> Iterator[str]:
+        """Yield the text of a plain (unstructured) response as it is generated."""
+        with instrumentation.span("llm.stream") as record:
+            key = self._cache_key(input, None, stop, kwargs)
+            cached = self._cache_get(key, None)
+            if cached is not None:
+                self._record(record, input, cached, True)
+                yield self._content_text(cached)
+                return
+
+            runnable = self._runnable()
+            chunks = []
+
+            for chunk in self.controller.stream(
+                    lambda: runnable.stream(input=input, config=config, stop=stop, **kwargs)):
+                text = self._content_text(chunk)
+
+                if text:
+                    chunks.append(text)
+                    yield text
+
+            self._finish_stream(record, input, key, chunks)
+
+    async def astream(self,
+                      input: "LLMInput",
+                      config: "RunnableConfig | None" = None,
+                      *,
+                      stop: list[str] | None = None,
+                      **kwargs: Any) -> AsyncIterator[str]:
+        with instrumentation.span("llm.astream") as record:
+            key = self._cache_key(input, None, stop, kwargs)
+            cached = self._cache_get(key, None)
+            if cached is not None:
+                self._record(record, input, cached, True)
+                yield self._content_text(cached)
+                return
+
+            runnable = self._runnable()
+            chunks = []
+
+            async for chunk in self.controller.astream(
+                    lambda: runnable.astream(input=input, config=config, stop=stop, **kwargs)):
+                text = self._content_text(chunk)
+
+                if text:
+                    chunks.append(text)
+                    yield text
+
+            self._finish_stream(record, input, key, chunks)
 
 
 class OllamaLLM(LLM):
-    def __init__(self, model: str, reasoning: bool = False) -> None:
-        super().__init__(model, reasoning)
-        self.llm = ChatOllama(model=model, reasoning=reasoning)
+    def __init__(self, model: str, reasoning: bool = False, cache: SQLiteCache | None = None,
+                 controller: ConcurrencyController | None = None) -> None:
+        super().__init__(model, reasoning, cache, controller)
+        self.llm = backends.get("llm.ollama")(model=model, reasoning=reasoning)
 
 
 class GoogleLLM(LLM):
-    def __init__(self, model: str, reasoning: bool = False) -> None:
-        super().__init__(model, reasoning)
-        self.llm = ChatGoogleGenerativeAI(model=model)
+    def __init__(self, model: str, reasoning: bool = False, cache: SQLiteCache | None = None,
+                 controller: ConcurrencyController | None = None) -> None:
+        super().__init__(model, reasoning, cache, controller)
+        self.llm = backends.get("llm.google")(model=model)
@@ -0,0 +1,252 @@
+import asyncio
+import functools
+
+from typing import Callable, NamedTuple
+
+from reelsmith import instrumentation
+from reelsmith.backends import backends
+from reelsmith.checkpoint import CheckpointStore, checkpointed, run_id_for
+from reelsmith.compress import ResearchCompressor
+from reelsmith.stub import State
+from reelsmith.llm import GoogleLLM, OllamaLLM, default_response_cache
+from reelsmith.render import VideoRenderer
+from reelsmith.research import SearXNGResearch, default_page_cache, default_summary_cache
+from reelsmith.script import ScriptGenerator
+from reelsmith.subtitles import SubtitleGenerator
+from reelsmith.tts import SAMPLE_RATE, StreamedSentences, TTSGenerator, default_audio_cache
+
+
+class Stage(NamedTuple):
+    name: str
+    kind: str
+    node: Callable[[State], dict]
+
+
+def updates(state: State, *fields: str) -> dict:
+    # Nodes return only the fields they produced; LangGraph and BatchRunner merge them into the state.
+    return {field: getattr(state, field) for field in fields}
+
+
+def input_node(state: State) -> dict:
+    return {}
+
+
+@functools.cache
+def response_cache():
+    return default_response_cache()
+
+
+# Shared by every job in the process, so only for synchronous calls (see research_node).
+@functools.cache
+def google_llm(model: str = "gemini-2.5-flash") -> GoogleLLM:
+    return GoogleLLM(model, cache=response_cache())
+
+
+@functools.cache
+def ollama_llm(model: str = "mistral") -> OllamaLLM:
+    return OllamaLLM(model, cache=response_cache())
+
+
+@functools.cache
+def page_cache():
+    return default_page_cache()
+
+
+@functools.cache
+def summary_cache():
+    return default_summary_cache()
+
+
+def research_node(state: State) -> dict:
+    # Research runs on its own event loop per job, and async LLM clients bind to the loop they are first used on,
+    # so this LLM can't be the process-wide one the synchronous script stage shares.
+    llm = GoogleLLM("gemini-2.5-flash", cache=response_cache())
+    # llm = OllamaLLM("mistral", cache=response_cache())
+    search_engine = SearXNGResearch(llm, "", page_cache=page_cache(), summary_cache=summary_cache())
+    state = asyncio.run(search_engine.research(state))
+    return updates(state, "search_summary")
+
+
+def compress_node(state: State) -> dict:
+    compressor = ResearchCompressor()
+    return updates(compressor.compress_research(state), "research_context")
+
+
+def script_node(state: State) -> dict:
+    script_generator = ScriptGenerator(google_llm(), "")
+
+    state = script_generator.generate_script_words(state)
+
+    script_generator = ScriptGenerator(ollama_llm(), "")
+
+    state = script_generator.generate_image_prompts(state)
+
+    return updates(state, "script", "image_segments")
+
+
+@functools.cache
+def audio_cache():
+    return default_audio_cache()
+
+
+TTS_FIELDS = ("final_audio_path", "audio_clip_durations", "word_timings")
+
+
+def tts_generator() -> TTSGenerator:
+    return TTSGenerator("af_bella", speed=1.25, cache=audio_cache())
+
+
+def caption_generator(mode: str = "tts") -> SubtitleGenerator:
+    return SubtitleGenerator(mode=mode, caption_format="ass")
+
+
+def tts_node(state: State) -> dict:
+    return updates(tts_generator().run_tts(state), *TTS_FIELDS)
+
+
+def captions_node(state: State) -> dict:
+    return updates(caption_generator().generate_captions(state), "caption_path")
+
+
+def narration_node(state: State) -> dict:
+    generator = tts_generator()
+    subtitle_generator = caption_generator(mode="segments")
+
+    # Each segment is aligned as soon as its audio is synthesized, overlapping captioning with TTS.
+    aligner = subtitle_generator.segment_aligner(SAMPLE_RATE)
+    state = generator.run_tts(state, on_segment=aligner)
+
+    state = subtitle_generator.generate_captions(state, aligner=aligner)
+    return updates(state, *TTS_FIELDS, "caption_path")
+
+
+def _streamed_script(state: State, subtitle_generator: SubtitleGenerator | None = None) -> State:
+    generator = tts_generator()
+
+    # Sentences are synthesized while the script is still streaming; segments and prompts come afterwards.
+    with StreamedSentences(generator) as sentences:
+        state = ScriptGenerator(google_llm(), "").stream_script(state, on_sentence=sentences.submit)
+        state = ScriptGenerator(ollama_llm(), "").generate_image_prompts(state)
+
+        if subtitle_generator is None:
+            return generator.run_tts(state, streamed=sentences)
+
+        aligner = subtitle_generator.segment_aligner(SAMPLE_RATE)
+        state = generator.run_tts(state, on_segment=aligner, streamed=sentences)
+
+    return subtitle_generator.generate_captions(state, aligner=aligner)
+
+
+def streamed_tts_node(state: State) -> dict:
+    return updates(_streamed_script(state), "script", "image_segments", *TTS_FIELDS)
+
+
+def streamed_narration_node(state: State) -> dict:
+    state = _streamed_script(state, caption_generator(mode="segments"))
+    return updates(state, "script", "image_segments", *TTS_FIELDS, "caption_path")
+
+
+def render_node(state: State) -> dict:
+    renderer = VideoRenderer(mode="chunked")
+    return updates(renderer.render(state), "video_path")
+
+
+def instrument_stage(stage: Stage) -> Stage:
+    return stage._replace(node=instrumentation.instrumented(f"node.{stage.name}")(stage.node))
+
+
+RESEARCH_STAGE = instrument_stage(Stage("research", "llm", research_node))
+COMPRESS_STAGE = instrument_stage(Stage("compress", "cpu", compress_node))
+SCRIPT_STAGE = instrument_stage(Stage("script", "llm", script_node))
+CAPTIONS_STAGE = instrument_stage(Stage("captions", "asr", captions_node))
+RENDER_STAGE = instrument_stage(Stage("render", "ffmpeg", render_node))
+
+STAGES = [
+    RESEARCH_STAGE,
+    COMPRESS_STAGE,
+    SCRIPT_STAGE,
+    instrument_stage(Stage("tts", "tts", tts_node)),
+    CAPTIONS_STAGE,
+    RENDER_STAGE,
+]
+
+OVERLAPPED_STAGES = [
+    RESEARCH_STAGE,
+    COMPRESS_STAGE,
+    SCRIPT_STAGE,
+    instrument_stage(Stage("narration", "tts", narration_node)),
+    RENDER_STAGE,
+]
+
+STREAMED_STAGES = [
+    RESEARCH_STAGE,
+    COMPRESS_STAGE,
+    instrument_stage(Stage("script_tts", "tts", streamed_tts_node)),
+    CAPTIONS_STAGE,
+    RENDER_STAGE,
+]
+
+STREAMED_OVERLAPPED_STAGES = [
+    RESEARCH_STAGE,
+    COMPRESS_STAGE,
+    instrument_stage(Stage("script_narration", "tts", streamed_narration_node)),
+    RENDER_STAGE,
+]
+
+
+def select_stages(overlap_captions: bool = False, stream_script: bool = False) -> list[Stage]:
+    if stream_script:
+        return STREAMED_OVERLAPPED_STAGES if overlap_captions else STREAMED_STAGES
+
+    return OVERLAPPED_STAGES if overlap_captions else STAGES
+
+
+def warm(stages: list[Stage]) -> None:
+    """Load the models the given stages need up front, so the first job doesn't pay for them."""
+    names = {stage.name for stage in stages}
+
+    if "research" in names:
+        backends.warm("llm.google")
+
+    # The script clients are cached, so every job reuses their HTTP connections.
+    if names & {"script", "script_tts", "script_narration"}:
+        google_llm()
+        ollama_llm()
+
+    if names & {"tts", "narration", "script_tts", "script_narration"}:
+        generator = tts_generator()
+        generator.pool.warm(generator.lang_code, generator.repo_id, generator.voice)
+
+    if "captions" in names:
+        caption_generator().warm()
+
+    if names & {"narration", "script_narration"}:
+        caption_generator(mode="segments").warm()
+
+    backends.warm("langgraph")
+
+
+def checkpoint_stages(stages: list[Stage], store: CheckpointStore, run_id: str | None = None) -> list[Stage]:
+    key = run_id if run_id is not None else (lambda state: run_id_for(state.topic))
+    return [stage._replace(node=checkpointed(store, key, stage.name, stage.node)) for stage in stages]
+
+
+def build_graph(stages: list[Stage] = STAGES, store: CheckpointStore | None = None, run_id: str | None = None):
+    if store is not None:
+        stages = checkpoint_stages(stages, store, run_id)
+
+    graph = backends.get("langgraph")
+
+    builder = graph.StateGraph(State)
+    builder.add_node("input", input_node)
+
+    previous = "input"
+    for stage in stages:
+        builder.add_node(stage.name, stage.node)
+        builder.add_edge(previous, stage.name)
+        previous = stage.name
+
+    builder.set_entry_point("input")
+    builder.add_edge(previous, graph.END)
+
+    return builder.compile()
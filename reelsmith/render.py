@@ -0,0 +1,208 @@
+import os
+import tempfile
+
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import ffmpeg
+
+from reelsmith import instrumentation
+from reelsmith.stub import State
+from reelsmith.subtitles import SubtitleGenerator
+
+
+class VideoRenderer:
+    def __init__(self, width: int = 1080, height: int = 1920, fps: int = 30, preset: str = "veryfast",
+                 crf: int = 23, background: str = "black",
+                 subtitle_style: str = "FontName=Arial,FontSize=28", mode: str = "single",
+                 max_workers: int | None = None, subtitles: str = "burn") -> None:
+        if mode not in ("single", "chunked"):
+            raise ValueError(f"Unknown render mode: {mode}")
+
+        if subtitles not in ("burn", "soft"):
+            raise ValueError(f"Unknown subtitle mode: {subtitles}")
+
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.preset = preset
+        self.crf = crf
+        self.background = background
+        self.subtitle_style = subtitle_style
+        self.mode = mode
+        self.max_workers = max_workers if max_workers is not None else os.cpu_count() or 1
+        self.subtitles = subtitles
+
+    def _clip(self, image_path: Path | None, duration: float):
+        if image_path is None:
+            return ffmpeg.input(f"color=c={self.background}:s={self.width}x{self.height}:r={self.fps}",
+                                f="lavfi", t=duration).video
+
+        return (
+            ffmpeg
+            .input(str(image_path), loop=1, t=duration, framerate=self.fps)
+            .video
+            .filter("scale", self.width, self.height, force_original_aspect_ratio="increase")
+            .filter("crop", self.width, self.height)
+            .filter("setsar", 1)
+        )
+
+    def _subtitled(self, video, caption_path: Path | None, offset: float = 0.0):
+        if caption_path is not None and Path(caption_path).suffix == ".ass":
+            # ASS files carry their own styles; shift the chunk onto the caption timeline instead of rewriting them.
+            if offset:
+                video = video.filter("setpts", f"PTS+{offset}/TB")
+
+            video = video.filter("ass", str(caption_path))
+
+            if offset:
+                video = video.filter("setpts", "PTS-STARTPTS")
+
+        elif caption_path is not None:
+            video = video.filter("subtitles", str(caption_path), force_style=self.subtitle_style)
+
+        return video.filter("format", "yuv420p")
+
+    @staticmethod
+    def _image_paths(state: State) -> list[Path | None]:
+        durations = state.audio_clip_durations
+        image_paths = state.image_paths or [None] * len(durations)
+
+        if len(image_paths) != len(durations):
+            raise ValueError(f"Got {len(image_paths)} images for {len(durations)} audio segments")
+
+        return image_paths
+
+    def _video(self, state: State, caption_path: Path | None):
+        clips = [self._clip(image_path, duration)
+                 for image_path, duration in zip(self._image_paths(state), state.audio_clip_durations)]
+        video = ffmpeg.concat(*clips, v=1, a=0) if len(clips) > 1 else clips[0]
+
+        return self._subtitled(video, caption_path)
+
+    def _boundaries(self, durations: list[float]) -> list[float]:
+        # Snap segment boundaries to whole frames so chunk lengths don't drift from the narration.
+        boundaries = [0.0]
+        elapsed = 0.0
+
+        for duration in durations:
+            elapsed += duration
+            boundaries.append(round(elapsed * self.fps) / self.fps)
+
+        return boundaries
+
+    @staticmethod
+    def _chunk_subtitles(subtitles: list[tuple[float, float, str]], start: float,
+                         end: float) -> list[tuple[float, float, str]]:
+        return [(max(cue_start, start) - start, min(cue_end, end) - start, text)
+                for cue_start, cue_end, text in subtitles if cue_end > start and cue_start < end]
+
+    def _encode_chunk(self, image_path: Path | None, start: float, duration: float, caption_path: Path | None,
+                      output_path: Path, threads: int) -> None:
+        offset = start if caption_path is not None and Path(caption_path).suffix == ".ass" else 0.0
+
+        (
+            ffmpeg
+            .output(self._subtitled(self._clip(image_path, duration), caption_path, offset), str(output_path),
+                    vcodec="libx264", preset=self.preset, crf=self.crf, r=self.fps, threads=threads)
+            .run(overwrite_output=True, quiet=True)
+        )
+
+    def _chunk_captions(self, caption_path: Path | None, subtitles: list[tuple[float, float, str]], start: float,
+                        end: float, chunk_path: Path) -> Path | None:
+        if caption_path is None or Path(caption_path).suffix == ".ass":
+            return caption_path
+
+        chunk_subtitles = self._chunk_subtitles(subtitles, start, end)
+        if not chunk_subtitles:
+            return None
+
+        chunk_caption_path = chunk_path.with_suffix(".srt")
+        SubtitleGenerator.write_srt(chunk_subtitles, chunk_caption_path)
+        return chunk_caption_path
+
+    def _render_chunked(self, state: State, caption_path: Path | None, output_path: Path) -> None:
+        boundaries = self._boundaries(state.audio_clip_durations)
+        subtitles = SubtitleGenerator.read_srt(caption_path) \
+            if caption_path is not None and Path(caption_path).suffix == ".srt" else []
+        workers = min(self.max_workers, len(state.audio_clip_durations))
+        threads = max(1, (os.cpu_count() or 1) // workers)
+
+        with tempfile.TemporaryDirectory() as work_dir:
+            jobs = []
+
+            for i, (image_path, start, end) in enumerate(zip(self._image_paths(state), boundaries, boundaries[1:])):
+                chunk_path = Path(work_dir) / f"chunk{i:04}.mp4"
+                chunk_caption_path = self._chunk_captions(caption_path, subtitles, start, end, chunk_path)
+                jobs.append((image_path, start, end - start, chunk_caption_path, chunk_path, threads))
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                list(executor.map(instrumentation.bind(lambda job: self._encode_chunk(*job)), jobs))
+
+            concat_list_path = Path(work_dir) / "chunks.txt"
+            concat_list_path.write_text("".join(f"file '{job[4].as_posix()}'\n" for job in jobs))
+
+            (
+                ffmpeg
+                .output(ffmpeg.input(str(concat_list_path), format="concat", safe=0).video,
+                        ffmpeg.input(str(state.final_audio_path)).audio,
+                        str(output_path), vcodec="copy", acodec="aac", movflags="+faststart", shortest=None)
+                .run(overwrite_output=True, quiet=True)
+            )
+
+    def _render_single(self, state: State, caption_path: Path | None, output_path: Path) -> None:
+        audio = ffmpeg.input(str(state.final_audio_path)).audio
+
+        (
+            ffmpeg
+            .output(self._video(state, caption_path), audio, str(output_path), vcodec="libx264", acodec="aac",
+                    preset=self.preset, crf=self.crf, r=self.fps, movflags="+faststart", shortest=None)
+            .run(overwrite_output=True, quiet=True)
+        )
+
+    @staticmethod
+    @instrumentation.instrumented("ffmpeg.mux_subtitles")
+    def mux_subtitles(video_path: Path, caption_path: Path, output_path: Path) -> None:
+        video = ffmpeg.input(str(video_path))
+        # MP4 only carries mov_text; Matroska keeps the ASS styling and highlight events as-is.
+        subtitle_codec = "mov_text" if Path(output_path).suffix in (".mp4", ".mov", ".m4v") else "copy"
+
+        (
+            ffmpeg
+            .output(video.video, video.audio, ffmpeg.input(str(caption_path))["s"], str(output_path),
+                    vcodec="copy", acodec="copy", scodec=subtitle_codec, movflags="+faststart")
+            .run(overwrite_output=True, quiet=True)
+        )
+
+    def recaption(self, state: State) -> State:
+        output_file = tempfile.NamedTemporaryFile(delete=False, suffix=Path(state.video_path).suffix)
+        output_file.close()
+
+        self.mux_subtitles(state.video_path, state.caption_path, Path(output_file.name))
+
+        state.video_path = Path(output_file.name)
+        return state
+
+    @instrumentation.instrumented("ffmpeg.render")
+    def render(self, state: State) -> State:
+        if not state.audio_clip_durations:
+            raise ValueError("Cannot render a video without audio segments")
+
+        output_file = tempfile.NamedTemporaryFile(delete=False, suffix=".mp4")
+        output_file.close()
+
+        caption_path = state.caption_path if self.subtitles == "burn" else None
+
+        if self.mode == "chunked":
+            self._render_chunked(state, caption_path, Path(output_file.name))
+        else:
+            self._render_single(state, caption_path, Path(output_file.name))
+
+        state.video_path = Path(output_file.name)
+
+        if self.subtitles == "soft" and state.caption_path is not None:
+            rendered_path = state.video_path
+            state = self.recaption(state)
+            rendered_path.unlink(missing_ok=True)
+
+        return state
@@ -1,81 +1,218 @@
-import threading
+import asyncio
+import codecs
+import json
+import logging
 
-import httpx
-
-from queue import Queue
+from abc import ABC, abstractmethod
+from contextlib import asynccontextmanager
+from typing import AsyncIterator
+from urllib.parse import urlsplit
 
-from bs4 import BeautifulSoup
+import httpx
 
+from reelsmith import instrumentation
+from reelsmith.cache import CACHE_DIR, SQLiteCache
+from reelsmith.extract import ParagraphExtractor
 from reelsmith.llm import LLM
 from reelsmith.stub import State
 
+SUMMARY_PROMPT = "Summarize this article in 500 words:\n\n{content}"
+
+logger = logging.getLogger(__name__)
+
 
-class Research:
-    def __init__(self, llm: LLM, instruction: str) -> None:
+def default_page_cache(ttl: float = 24 * 60 * 60, max_bytes: int = 256 * 1024 ** 2) -> SQLiteCache:
+    return SQLiteCache(CACHE_DIR / "pages.sqlite3", ttl=ttl, max_bytes=max_bytes)
+
+
+def default_summary_cache(max_bytes: int = 64 * 1024 ** 2) -> SQLiteCache:
+    return SQLiteCache(CACHE_DIR / "summaries.sqlite3", max_bytes=max_bytes)
+
+
+class Research(ABC):
+    def __init__(self, llm: LLM, instruction: str, max_concurrency: int = 16, max_per_host: int = 4,
+                 timeout: float = 5, client: httpx.AsyncClient | None = None,
+                 page_cache: SQLiteCache | None = None, summary_cache: SQLiteCache | None = None,
+                 max_chars: int = 20000, max_bytes: int = 2 * 1024 ** 2) -> None:
         self.llm = llm
         self.instruction = instruction
+        self.max_concurrency = max_concurrency
+        self.max_per_host = max_per_host
+        self.timeout = timeout
+        self.client = client
+        self.page_cache = page_cache
+        self.summary_cache = summary_cache
+        self.max_chars = max_chars
+        self.max_bytes = max_bytes
+
+        self._global_limit: asyncio.Semaphore | None = None
+        self._host_limits: dict[str, asyncio.Semaphore] = {}
+
+    def _create_client(self) -> httpx.AsyncClient:
+        return httpx.AsyncClient(
+            http2=True,
+            timeout=self.timeout,
+            follow_redirects=True,
+            limits=httpx.Limits(max_connections=self.max_concurrency,
+                                max_keepalive_connections=self.max_concurrency)
+        )
+
+    @asynccontextmanager
+    async def _limit(self, url: str) -> AsyncIterator[None]:
+        host = urlsplit(url).netloc
+        host_limit = self._host_limits.setdefault(host, asyncio.Semaphore(self.max_per_host))
+
+        async with self._global_limit, host_limit:
+            yield
 
     @staticmethod
-    def _extract_content(url: str) -> str:
+    def _is_html(response: httpx.Response) -> bool:
+        content_type = response.headers.get("Content-Type", "").lower()
+        return not content_type or "html" in content_type
+
+    async def _stream_paragraphs(self, response: httpx.Response) -> str:
+        extractor = ParagraphExtractor(max_chars=self.max_chars)
+        decoder = codecs.getincrementaldecoder(response.encoding or "utf-8")(errors="replace")
+        received = 0
+
+        async for chunk in response.aiter_bytes():
+            extractor.feed(decoder.decode(chunk))
+            received += len(chunk)
+
+            if extractor.done or received >= self.max_bytes:
+                break
+
+        extractor.close()
+
+        instrumentation.count("research.bytes_fetched", received)
+        instrumentation.count("research.chars_extracted", min(extractor.chars, self.max_chars))
+        return extractor.text()
+
+    def _cached_page(self, url: str) -> tuple[dict, bool] | None:
+        if self.page_cache is None:
+            return None
+
+        entry = self.page_cache.get_entry(SQLiteCache.key(url))
+        if entry is None:
+            return None
+
+        value, created_at = entry
+        return json.loads(value), self.page_cache.is_fresh(created_at)
+
+    def _store_page(self, url: str, text: str, response: httpx.Response) -> None:
+        if self.page_cache is None:
+            return
+
+        self.page_cache.set(SQLiteCache.key(url), json.dumps({
+            "text": text,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+        }).encode())
+
+    @instrumentation.instrumented("research.extract_content")
+    async def _extract_content(self, client: httpx.AsyncClient, url: str) -> str:
+        cached = self._cached_page(url)
+        headers = {}
+
+        if cached is not None:
+            page, fresh = cached
+            if fresh:
+                instrumentation.count("research.page_cache_hits")
+                return page["text"]
+
+            if page["etag"]:
+                headers["If-None-Match"] = page["etag"]
+            if page["last_modified"]:
+                headers["If-Modified-Since"] = page["last_modified"]
+
         try:
-            response = httpx.get(url, timeout=5)
-            response.raise_for_status()
+            async with self._limit(url), client.stream("GET", url, headers=headers) as response:
+                if response.status_code == 304 and cached is not None:
+                    self.page_cache.touch(SQLiteCache.key(url))
+                    instrumentation.count("research.page_revalidations")
+                    return cached[0]["text"]
 
-            soup = BeautifulSoup(response.text, "html.parser")
-            return ' '.join(p.get_text() for p in soup.find_all("p")).strip().replace('\n', ' ')
+                response.raise_for_status()
 
-        except httpx.HTTPStatusError:
+                if not self._is_html(response):
+                    return ""
+
+                text = await self._stream_paragraphs(response)
+
+            self._store_page(url, text, response)
+            return text
+
+        except (httpx.HTTPError, httpx.InvalidURL, ValueError) as e:
+            # ValueError covers URLs that urlsplit or IDNA encoding reject; one bad search hit drops only itself.
+            logger.warning("Dropping research from %s: fetch failed: %r", url, e)
+            instrumentation.count("research.fetch_errors")
             return ""
 
-    def _summarize(self, url: str, output_queue: Queue):
-        content = self._extract_content(url)
+    def _summary_key(self, content: str) -> str:
+        return SQLiteCache.key(SQLiteCache.key(content), type(self.llm).__name__, self.llm.model, SUMMARY_PROMPT)
+
+    async def _summarize(self, client: httpx.AsyncClient, url: str) -> str:
+        content = await self._extract_content(client, url)
 
         if not content:
-            output_queue.put("")
-            return
+            return ""
 
-        prompt = f"Summarize this article in 500 words:\n\n{content}"
+        if self.summary_cache is not None:
+            cached = self.summary_cache.get(self._summary_key(content))
+            if cached is not None:
+                return cached.decode()
 
-        try:
-            result = self.llm.invoke(prompt)
-            output_queue.put(result.content.strip())
+        prompt = SUMMARY_PROMPT.format(content=content)
 
-        except Exception:
-            output_queue.put("")
+        try:
+            result = await self.llm.ainvoke(prompt)
+            summary = result.content.strip()
 
-    def research(self, state: State) -> State:
-        urls = self._search(state.topic)
-        output_queue = Queue()
-        threads = []
+        except Exception as e:
+            # The LLM controller already retried transient failures, so this source is dropped for good.
+            logger.warning("Dropping research from %s: summarization failed: %r", url, e)
+            instrumentation.count("research.summary_errors")
+            return ""
 
-        for url in urls:
-            thread = threading.Thread(target=self._summarize, args=(url, output_queue))
-            thread.start()
-            threads.append(thread)
+        if self.summary_cache is not None and summary:
+            self.summary_cache.set(self._summary_key(content), summary.encode())
 
-        for thread in threads:
-            thread.join()
+        return summary
 
-        summaries = [output_queue.get() for _ in urls]
+    async def _research(self, client: httpx.AsyncClient, state: State) -> State:
+        urls = await self._search(client, state.topic)
+        summaries = await asyncio.gather(*(self._summarize(client, url) for url in urls))
 
-        state.search_summary = summaries
+        state.search_summary = list(summaries)
         return state
 
-    def _search(self, topic: str, max_results: int = 5) -> list[str]:
-        pass
+    async def research(self, state: State) -> State:
+        self._global_limit = asyncio.Semaphore(self.max_concurrency)
+        self._host_limits = {}
+
+        if self.client is not None:
+            return await self._research(self.client, state)
+
+        async with self._create_client() as client:
+            return await self._research(client, state)
+
+    @abstractmethod
+    async def _search(self, client: httpx.AsyncClient, topic: str, max_results: int = 5) -> list[str]:
+        ...
 
 
 class SearXNGResearch(Research):
-    def __init__(self, llm: LLM, instruction: str, searxng_url="http://localhost:8888") -> None:
-        super().__init__(llm, instruction)
+    def __init__(self, llm: LLM, instruction: str, searxng_url="http://localhost:8888", **kwargs) -> None:
+        super().__init__(llm, instruction, **kwargs)
         self.searxng_url = searxng_url
 
-    def _search(self, topic: str, max_results: int = 3):
+    async def _search(self, client: httpx.AsyncClient, topic: str, max_results: int = 3):
         try:
-            response = httpx.get(f"{self.searxng_url}/search", params={
-                "q": topic,
-                "format": "json"
-            })
+            async with self._limit(self.searxng_url):
+                response = await client.get(f"{self.searxng_url}/search", params={
+                    "q": topic,
+                    "format": "json"
+                })
             results = response.json().get("results", [])
             urls = [r.get("url") for r in results if r.get("url")]
             return urls[:max_results]
@@ -1,6 +1,122 @@
-from reelsmith.stub import State, ImagePromptSegment, Script, ImageSegmentList
+import re
+
+from typing import Callable
+
+from reelsmith.stub import (State, ImagePromptSegment, ImagePromptList, Script, ScriptDraft, ImageSegmentList,
+                            ends_sentence, sentence_ranges)
 from reelsmith.llm import LLM
 
+SENTENCE_BOUNDARY = re.compile(r"[.!?]+(?=\s)")
+
+
+class SentenceStream:
+    """Splits streamed text into sentences, holding back the trailing one until it is known to be complete."""
+
+    def __init__(self) -> None:
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> list[str]:
+        self._buffer += chunk
+        sentences = []
+        start = 0
+
+        for match in SENTENCE_BOUNDARY.finditer(self._buffer):
+            following = self._buffer[match.end():].split(maxsplit=1)
+            if not following:
+                # Whether this ends a sentence depends on the next word, which hasn't arrived yet.
+                break
+
+            sentence = " ".join(self._buffer[start:match.end()].split())
+            if not ends_sentence(sentence.rsplit(" ", 1)[-1], following[0]):
+                continue
+
+            sentences.append(sentence)
+            start = match.end()
+
+        self._buffer = self._buffer[start:]
+        return sentences
+
+    def close(self) -> list[str]:
+        sentence = " ".join(self._buffer.split())
+        self._buffer = ""
+        return [sentence] if sentence else []
+
+
+def _split_largest(ranges: list[list[int]]) -> bool:
+    index = max(range(len(ranges)), key=lambda i: ranges[i][1] - ranges[i][0])
+    start, end = ranges[index]
+
+    if start == end:
+        return False
+
+    middle = (start + end) // 2
+    ranges[index:index + 1] = [[start, middle], [middle + 1, end]]
+    return True
+
+
+def _merge_smallest(ranges: list[list[int]]) -> None:
+    index = min(range(len(ranges) - 1), key=lambda i: ranges[i + 1][1] - ranges[i][0])
+    ranges[index:index + 2] = [[ranges[index][0], ranges[index + 1][1]]]
+
+
+def _fit_count(ranges: list[list[int]], min_segments: int, max_segments: int) -> list[list[int]]:
+    while len(ranges) < min_segments and _split_largest(ranges):
+        pass
+
+    while len(ranges) > max_segments:
+        _merge_smallest(ranges)
+
+    return ranges
+
+
+def segment_words(words: list[str], min_segments: int = 6, max_segments: int = 8) -> list[list[int]]:
+    if not words:
+        return []
+
+    sentences = sentence_ranges(words)
+    if len(sentences) <= max_segments:
+        return _fit_count(sentences, min_segments, max_segments)
+
+    # Group whole sentences so each segment gets roughly the same number of words.
+    segments = []
+    target = len(words) / max_segments
+    start = 0
+
+    for i, (_, end) in enumerate(sentences):
+        remaining_sentences = len(sentences) - i - 1
+        remaining_segments = max_segments - len(segments) - 1
+
+        if remaining_segments == 0:
+            break
+
+        if end + 1 - start >= target or remaining_sentences == remaining_segments:
+            segments.append([start, end])
+            start = end + 1
+
+    segments.append([start, len(words) - 1])
+    return _fit_count(segments, min_segments, max_segments)
+
+
+def repair_word_ranges(ranges: list[list[int]], length: int, min_segments: int = 6,
+                       max_segments: int = 8) -> list[list[int]]:
+    starts = sorted({min(max(r[0], 0), length - 1) for r in ranges if len(r) == 2} | {0})
+    repaired = [[start, end - 1] for start, end in zip(starts, starts[1:] + [length])]
+
+    return _fit_count(repaired, min(min_segments, length), max_segments)
+
+
+def valid_word_ranges(ranges: list[list[int]], length: int, min_segments: int = 6, max_segments: int = 8) -> bool:
+    if not min_segments <= len(ranges) <= max_segments or any(len(r) != 2 for r in ranges):
+        return False
+
+    expected = 0
+    for start, end in ranges:
+        if start != expected or end < start:
+            return False
+        expected = end + 1
+
+    return expected == length
+
 
 class ScriptGenerator:
     def __init__(self, llm: LLM, instruction: str):
@@ -29,12 +145,93 @@ Topic: {topic}
 Research: {research}
         """
 
-        state.script = self.llm.invoke(prompt.format(topic=state.topic, research=state.search_summary),
-                                       output_structure=Script)
+        research = state.research_context if state.research_context is not None else state.search_summary
+        draft = self.llm.invoke(prompt.format(topic=state.topic, research=research), output_structure=ScriptDraft)
+        state.script = Script.from_words(draft.script_plaintext, draft.script_words)
+
+        return state
+
+    def stream_script(self, state: State, on_sentence: Callable[[str], None]) -> State:
+        prompt = """
+You are a helpful assistant that writes short, coherent video scripts for narration.
+You will be given a script topic, and research performed on that topic by surfing the web. You have to write a script 
+of 12–15 sentences that explains or tells a story about the topic in clear and natural language.
+
+Rules:
+- Reply with the script text only, as plain prose.
+- Do not include any metadata, headings, markdown, or formatting.
+- The script should be grammatically correct and easy to narrate.
+
+Topic: {topic}
+Research: {research}
+        """
+
+        research = state.research_context if state.research_context is not None else state.search_summary
+        sentences = SentenceStream()
+        chunks = []
+
+        for chunk in self.llm.stream(prompt.format(topic=state.topic, research=research)):
+            chunks.append(chunk)
 
+            for sentence in sentences.feed(chunk):
+                on_sentence(sentence)
+
+        for sentence in sentences.close():
+            on_sentence(sentence)
+
+        state.script = Script.from_text(" ".join("".join(chunks).split()))
         return state
 
-    def generate_image_prompts(self, state: State) -> State:
+    def generate_image_prompts(self, state: State, local_segmentation: bool = True) -> State:
+        if local_segmentation:
+            return self._generate_segment_prompts(state)
+
+        return self._generate_image_segments(state)
+
+    def _generate_segment_prompts(self, state: State) -> State:
+        prompt = """
+You are a creative assistant generating image prompts for an AI-generated video narration.
+
+The narration script has already been divided into {count} numbered segments. Write exactly one visually rich and 
+descriptive image prompt for each segment, in order, for use by AI models like DALL·E or Midjourney.
+
+Your response must be a JSON object with:
+- prompts: a list of exactly {count} strings, where the i-th string is the image prompt for segment i.
+
+The prompt should be **very specific, detailed, and grounded in the actual content** of the corresponding segment. Avoid vague prompts.
+
+Examples:
+If the segment describes a historical event, a good prompt would be:  
+  "A dusty battlefield in 1860s America, Union and Confederate soldiers in blue and grey uniforms clashing under a smoky sky"
+
+If the segment describes future technology:  
+  "A sleek, autonomous flying car hovering over a neon-lit smart city at night, glowing holograms and glass skyscrapers in the background"
+
+If it talks about a biological process:  
+  "A close-up of white blood cells attacking virus particles inside the human bloodstream, with red blood cells in the background"
+
+Here are the segments to process:  
+{segments}
+        """
+
+        words = state.script.script_words
+        ranges = segment_words(words)
+        segments = "\n".join(f"{i}. {state.script.text(start, end)}" for i, (start, end) in enumerate(ranges))
+
+        prompts = self.llm.invoke(prompt.format(count=len(ranges), segments=segments),
+                                  output_structure=ImagePromptList).prompts
+
+        # Never retry over a miscount: pad with the segment text itself, or drop extras.
+        prompts = prompts[:len(ranges)] + [state.script.text(start, end) for start, end in ranges[len(prompts):]]
+
+        state.image_segments = ImageSegmentList(image_segments=[
+            ImagePromptSegment(prompt=image_prompt, word_range=word_range)
+            for image_prompt, word_range in zip(prompts, ranges)
+        ])
+
+        return state
+
+    def _generate_image_segments(self, state: State) -> State:
         prompt = """
 You are a creative assistant generating image prompts for an AI-generated video narration.
 
@@ -74,4 +271,18 @@ Here are the script_words to process:
                           last_index=len(state.script.script_words) - 1),
             output_structure=ImageSegmentList)
 
+        segments = state.image_segments.image_segments
+        length = len(state.script)
+        ranges = [segment.word_range for segment in segments]
+
+        if not valid_word_ranges(ranges, length):
+            ranges = repair_word_ranges(ranges, length)
+            prompts = [segment.prompt for segment in segments]
+            prompts = prompts[:len(ranges)] + [prompts[-1] if prompts else ""] * (len(ranges) - len(prompts))
+
+            state.image_segments = ImageSegmentList(image_segments=[
+                ImagePromptSegment(prompt=image_prompt, word_range=word_range)
+                for image_prompt, word_range in zip(prompts, ranges)
+            ])
+
         return state
@@ -1,7 +1,10 @@
+import re
+
+from functools import cached_property
 from pathlib import Path
-from typing import Optional, Tuple
+from typing import Any, Optional, Sequence, Tuple
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, model_validator
 
 
 class ImagePromptSegment(BaseModel):
@@ -14,20 +17,149 @@ class ImageSegmentList(BaseModel):
     image_segments: list[ImagePromptSegment]
 
 
-class Script(BaseModel):
+class ImagePromptList(BaseModel):
+    prompts: list[str] = Field(..., description="One image prompt per script segment, in segment order.")
+
+
+class ScriptDraft(BaseModel):
     script_plaintext: str
     script_words: list[str]
 
 
+SENTENCE_ENDINGS = (".", "!", "?")
+PUNCTUATION = (".", ",", "!", "?", ";", ":")
+# Numbers keep their decimal/thousands separators, words their apostrophes and hyphens; other symbols stand alone.
+WORD_PATTERN = re.compile(r"\d+(?:[.,:]\d+)*%?|\w+(?:['’-]\w+)*|[^\w\s]")
+
+
+def ends_sentence(word: str, following: str, previous: str = "") -> bool:
+    """
+    Whether ``word`` ends a sentence, given the word after it and, for punctuation tokenized on its own, the word
+    before it. Abbreviations and initialisms ("U.S. economy", "J. Smith", "e.g. this") don't.
+    """
+    if not word.endswith(SENTENCE_ENDINGS) or not following.lstrip("".join(SENTENCE_ENDINGS)) \
+            or following[:1].islower():
+        return False
+
+    if word.endswith("."):
+        stem = word[:-1] or previous
+        if (len(stem) == 1 and stem.isalpha()) or "." in stem:
+            return False
+
+    return True
+
+
+def sentence_ranges(words: Sequence[str]) -> list[list[int]]:
+    ranges = []
+    start = 0
+
+    for i, word in enumerate(words[:-1]):
+        if ends_sentence(word, words[i + 1], words[i - 1] if i > 0 else ""):
+            ranges.append([start, i])
+            start = i + 1
+
+    if start < len(words):
+        ranges.append([start, len(words) - 1])
+
+    return ranges
+
+
+def _word_offsets(text: str, words: Sequence[str]) -> list[int] | None:
+    offsets = []
+    cursor = 0
+
+    for word in words:
+        start = text.find(word, cursor)
+        if start < 0:
+            return None
+
+        cursor = start + len(word)
+        offsets += [start, cursor]
+
+    return offsets
+
+
+class Script(BaseModel):
+    """The script plaintext plus flat ``[start, end, start, end, ...]`` character offsets of each word in it."""
+
+    script_plaintext: str
+    word_offsets: list[int]
+
+    @model_validator(mode="before")
+    @classmethod
+    def _from_words(cls, data: Any) -> Any:
+        if isinstance(data, dict) and "script_words" in data and "word_offsets" not in data:
+            return cls.from_words(data.get("script_plaintext", ""), data["script_words"]).model_dump()
+
+        return data
+
+    @classmethod
+    def from_words(cls, plaintext: str, words: Sequence[str]) -> "Script":
+        offsets = _word_offsets(plaintext, words)
+
+        if offsets is None:
+            # The words don't appear in order in the plaintext, so rebuild it from the words.
+            plaintext = "".join(word if i == 0 or word in PUNCTUATION else f" {word}" for i, word in enumerate(words))
+            offsets = _word_offsets(plaintext, words)
+
+        return cls(script_plaintext=plaintext, word_offsets=offsets)
+
+    @classmethod
+    def from_text(cls, plaintext: str) -> "Script":
+        return cls.from_words(plaintext, WORD_PATTERN.findall(plaintext))
+
+    def __len__(self) -> int:
+        return len(self.word_offsets) // 2
+
+    def word(self, index: int) -> str:
+        return self.script_plaintext[self.word_offsets[2 * index]:self.word_offsets[2 * index + 1]]
+
+    def text(self, start: int, end: int) -> str:
+        """The plaintext spanning words ``start`` to ``end`` inclusive."""
+        return self.script_plaintext[self.word_offsets[2 * start]:self.word_offsets[2 * end + 1]]
+
+    @cached_property
+    def script_words(self) -> list[str]:
+        return [self.word(i) for i in range(len(self))]
+
+    @cached_property
+    def sentences(self) -> list[list[int]]:
+        return sentence_ranges(self.script_words)
+
+
+class WordTiming(BaseModel):
+    word: str
+    start: float
+    end: float
+
+
 class State(BaseModel):
     topic: str = Field(description="The topic for the video script.")
     search_summary: Optional[list[str]] = Field(
         description="The summary of the research performed by searching the web.", default=None)
+    research_context: Optional[str] = Field(
+        description="The deduplicated, ranked research packed into the script prompt's token budget.", default=None)
     script: Optional[Script] = Field(description="The video script in plain text and word split form.", default=None)
     image_segments: Optional[ImageSegmentList] = Field(description="The image prompts for each range of words",
                                                        default=None)
+    image_paths: Optional[list[Optional[Path]]] = Field(description="The generated image for each image segment.",
+                                                        default=None)
     final_audio_path: Optional[Path] = Field(description="The path to the generated audio.", default=None)
     audio_clip_durations: Optional[list[float]] = Field(description="The durations of the generated audio segments.",
                                                         default=None)
+    word_timings: Optional[list[WordTiming]] = Field(description="Word-level timings of the generated audio.",
+                                                     default=None)
     caption_path: Optional[Path] = Field(description="The path to the generated captions.", default=None)
     video_path: Optional[Path] = Field(description="The path to the final generated video.", default=None)
+
+    def merged(self, update: dict[str, Any]) -> "State":
+        """
+        Apply a node's partial update. Only the updated fields are validated (e.g. a checkpoint's JSON back into
+        models); the other fields are shared with this state, not copied.
+        """
+        merged = self.model_copy()
+
+        for name, value in update.items():
+            self.__pydantic_validator__.validate_assignment(merged, name, value)
+
+        return merged
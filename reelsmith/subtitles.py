@@ -1,18 +1,232 @@
+import gc
+import sys
 import tempfile
+import threading
+import time
+
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
 from pathlib import Path
+from typing import Any, Callable, Hashable
+
+import numpy as np
 
-import torch
-import whisperx
+from pydantic import BaseModel
 
+from reelsmith import instrumentation
+from reelsmith.backends import backends
 from reelsmith.stub import State
+from reelsmith.tts import TTSGenerator
+
+# Same as whisperx.audio.SAMPLE_RATE, duplicated so reading it doesn't import whisperx.
+WHISPER_SAMPLE_RATE = 16000
+
+ASR_MODEL_SIZES = {
+    "tiny": 75 * 1024 ** 2,
+    "base": 145 * 1024 ** 2,
+    "small": 480 * 1024 ** 2,
+    "medium": 1536 * 1024 ** 2,
+    "large-v2": 3 * 1024 ** 3,
+    "large-v3": 3 * 1024 ** 3,
+}
+
+
+class ModelRegistry:
+    def __init__(self, memory_budget: int = 8 * 1024 ** 3) -> None:
+        self.memory_budget = memory_budget
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+        self._lock = threading.Lock()
+        self._models: OrderedDict[Hashable, tuple[Any, int]] = OrderedDict()
+        self._loading: dict[Hashable, threading.Lock] = {}
+
+    @staticmethod
+    def _estimate_size(model: Any) -> int:
+        # A torch module can only exist once torch is imported, so never import it just to check.
+        torch = sys.modules.get("torch")
+        if torch is not None and isinstance(model, torch.nn.Module):
+            return sum(p.numel() * p.element_size() for p in model.parameters())
+
+        if isinstance(model, (tuple, list)):
+            return sum(ModelRegistry._estimate_size(m) for m in model)
+
+        return 0
+
+    @property
+    def memory_used(self) -> int:
+        return sum(size for _, size in self._models.values())
+
+    def _evict(self) -> None:
+        evicted = False
+
+        while len(self._models) > 1 and self.memory_used > self.memory_budget:
+            self._models.popitem(last=False)
+            self.evictions += 1
+            evicted = True
+
+        if evicted:
+            gc.collect()
+            torch = sys.modules.get("torch")
+            if torch is not None and torch.cuda.is_available():
+                torch.cuda.empty_cache()
+
+    def get(self, key: Hashable, loader: Callable[[], Any], size: int | None = None) -> Any:
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                self.hits += 1
+                return self._models[key][0]
+
+            key_lock = self._loading.setdefault(key, threading.Lock())
+
+        with key_lock:
+            with self._lock:
+                if key in self._models:
+                    self._models.move_to_end(key)
+                    self.hits += 1
+                    return self._models[key][0]
+
+            start = time.perf_counter()
+            model = loader()
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self.misses += 1
+                self.load_seconds += elapsed
+                self._models[key] = (model, size if size is not None else self._estimate_size(model))
+                self._loading.pop(key, None)
+                self._evict()
+
+        return model
+
+    def clear(self) -> None:
+        with self._lock:
+            self._models.clear()
+
+        gc.collect()
+
+    def stats(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "load_seconds": self.load_seconds,
+                "models": len(self._models),
+                "memory_used": self.memory_used,
+                "memory_budget": self.memory_budget,
+            }
+
+
+model_registry = ModelRegistry()
+
+
+class CaptionStyle(BaseModel):
+    font: str = "Arial"
+    font_size: int = 80
+    primary_color: str = "&H00FFFFFF"
+    highlight_color: str = "&H0000FFFF"
+    outline_color: str = "&H00000000"
+    outline: int = 4
+    shadow: int = 0
+    bold: bool = True
+    alignment: int = 2
+    margin_v: int = 320
+    width: int = 1080
+    height: int = 1920
+
+    def _style(self, name: str, color: str) -> str:
+        return (f"Style: {name},{self.font},{self.font_size},{color},{color},{self.outline_color},&H80000000,"
+                f"{-1 if self.bold else 0},0,0,0,100,100,0,0,1,{self.outline},{self.shadow},{self.alignment},"
+                f"60,60,{self.margin_v},1")
+
+    def header(self) -> str:
+        return "\n".join([
+            "[Script Info]",
+            "ScriptType: v4.00+",
+            f"PlayResX: {self.width}",
+            f"PlayResY: {self.height}",
+            "WrapStyle: 0",
+            "ScaledBorderAndShadow: yes",
+            "",
+            "[V4+ Styles]",
+            "Format: Name, Fontname, Fontsize, PrimaryColour, SecondaryColour, OutlineColour, BackColour, Bold, "
+            "Italic, Underline, StrikeOut, ScaleX, ScaleY, Spacing, Angle, BorderStyle, Outline, Shadow, "
+            "Alignment, MarginL, MarginR, MarginV, Encoding",
+            self._style("Default", self.primary_color),
+            self._style("Highlight", self.highlight_color),
+            "",
+            "[Events]",
+            "Format: Layer, Start, End, Style, Name, MarginL, MarginR, MarginV, Effect, Text",
+        ]) + "\n"
+
+
+class SegmentAligner:
+    def __init__(self, generator: "SubtitleGenerator", sample_rate: int, max_workers: int = 2) -> None:
+        self.generator = generator
+        self.sample_rate = sample_rate
+
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="reelsmith-align")
+        self._futures: dict[int, Future] = {}
+
+    def __call__(self, index: int, text: str, audio: np.ndarray) -> None:
+        self._futures[index] = self._executor.submit(instrumentation.bind(self.generator._align_segment), text,
+                                                     audio, self.sample_rate)
+
+    def words(self, durations: list[float]) -> list[dict]:
+        words = []
+        offset = 0.0
+
+        try:
+            for index, duration in enumerate(durations):
+                for word in self._futures[index].result():
+                    word = dict(word)
+
+                    for key in ("start", "end"):
+                        if key in word:
+                            word[key] += offset
+
+                    words.append(word)
+
+                offset += duration
+
+        finally:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+
+        return words
 
 
 class SubtitleGenerator:
-    def __init__(self, model: str = "large-v2", device: str = "cuda" if torch.cuda.is_available() else "cpu",
-                 compute_type="int8") -> None:
+    def __init__(self, model: str = "large-v2", device: str | None = None,
+                 compute_type="int8", mode: str = "tts", language: str = "en",
+                 registry: ModelRegistry | None = None, caption_format: str = "srt",
+                 style: CaptionStyle | None = None, align_workers: int = 2) -> None:
+        if mode not in ("tts", "segments", "align", "asr"):
+            raise ValueError(f"Unknown caption mode: {mode}")
+
+        if caption_format not in ("srt", "ass"):
+            raise ValueError(f"Unknown caption format: {caption_format}")
+
         self.model = model
-        self.device = device
+        self._device = device
         self.compute_type = compute_type
+        self.mode = mode
+        self.language = language
+        self.registry = registry if registry is not None else model_registry
+        self.caption_format = caption_format
+        self.style = style if style is not None else CaptionStyle()
+        self.align_workers = align_workers
+
+    @property
+    def device(self) -> str:
+        if self._device is None:
+            self._device = "cuda" if backends.get("torch").cuda.is_available() else "cpu"
+
+        return self._device
 
     @staticmethod
     def _chunk_words(words, chunk_size=3) -> list[tuple[int, int, str]]:
@@ -34,10 +248,10 @@ class SubtitleGenerator:
 
     @staticmethod
     def format_time(seconds: int) -> str:
-        ms = int((seconds - int(seconds)) * 1000)
-        h = int(seconds // 3600)
-        m = int((seconds % 3600) // 60)
-        sec = int(seconds % 60)
+        total_ms = round(seconds * 1000)
+        h, total_ms = divmod(total_ms, 3600 * 1000)
+        m, total_ms = divmod(total_ms, 60 * 1000)
+        sec, ms = divmod(total_ms, 1000)
         return f"{h:02}:{m:02}:{sec:02},{ms:03}"
 
     @staticmethod
@@ -48,20 +262,176 @@ class SubtitleGenerator:
                 f.write(f"{SubtitleGenerator.format_time(start)} --> {SubtitleGenerator.format_time(end)}\n")
                 f.write(f"{text.strip()}\n\n")
 
-    def generate_captions(self, state: State) -> State:
-        model = whisperx.load_model(self.model, device=self.device, compute_type=self.compute_type)
-        audio = whisperx.load_audio(str(state.final_audio_path))
-        result = model.transcribe(audio)
+    @staticmethod
+    def format_ass_time(seconds: float) -> str:
+        total_cs = round(seconds * 100)
+        h, total_cs = divmod(total_cs, 3600 * 100)
+        m, total_cs = divmod(total_cs, 60 * 100)
+        sec, cs = divmod(total_cs, 100)
+        return f"{h}:{m:02}:{sec:02}.{cs:02}"
+
+    @staticmethod
+    def _ass_events(words, chunk_size=3) -> list[tuple[float, float, str]]:
+        events = []
+        words = [word for word in words if "start" in word and "end" in word]
+
+        for i in range(0, len(words), chunk_size):
+            w = words[i:i + chunk_size]
+            texts = [word.get("word", word.get("text", "")).strip().replace("{", "(").replace("}", ")") for word in w]
+
+            for j, word in enumerate(w):
+                end = w[j + 1]["start"] if j + 1 < len(w) else word["end"]
+                text = " ".join("{\\rHighlight}" + t + "{\\r}" if k == j else t for k, t in enumerate(texts))
+                events.append((word["start"], max(end, word["start"]), text))
+
+        return events
+
+    @staticmethod
+    def write_ass(words, ass_file_path: Path, style: CaptionStyle, chunk_size=3) -> None:
+        with open(ass_file_path, "w") as f:
+            f.write(style.header())
+
+            for start, end, text in SubtitleGenerator._ass_events(words, chunk_size=chunk_size):
+                f.write(f"Dialogue: 0,{SubtitleGenerator.format_ass_time(start)},"
+                        f"{SubtitleGenerator.format_ass_time(end)},Default,,0,0,0,,{text}\n")
+
+    @staticmethod
+    def parse_time(timestamp: str) -> float:
+        hms, ms = timestamp.strip().split(",")
+        h, m, s = hms.split(":")
+        return int(h) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+    @staticmethod
+    def read_srt(srt_file_path: Path) -> list[tuple[float, float, str]]:
+        subtitles = []
+
+        for block in Path(srt_file_path).read_text().strip().split("\n\n"):
+            lines = block.strip().splitlines()
+            if len(lines) < 2 or "-->" not in lines[1]:
+                continue
+
+            start, end = lines[1].split("-->")
+            subtitles.append((SubtitleGenerator.parse_time(start), SubtitleGenerator.parse_time(end),
+                              "\n".join(lines[2:])))
+
+        return subtitles
+
+    @staticmethod
+    def _join_words(words: list[str]) -> str:
+        text = ""
+
+        for word in words:
+            if text and any(c.isalnum() for c in word):
+                text += " "
+            text += word
+
+        return text
+
+    @staticmethod
+    def _known_segments(state: State) -> list[dict]:
+        segments = []
+        start = 0.0
+
+        for sentence, duration in zip(TTSGenerator._generate_sentences(state), state.audio_clip_durations):
+            segments.append({
+                "text": SubtitleGenerator._join_words(sentence.split(" ")),
+                "start": start,
+                "end": start + duration
+            })
+            start += duration
+
+        return segments
+
+    def _align_model(self):
+        whisperx = backends.get("whisperx")
+        return self.registry.get(
+            ("align", None, self.device, None, self.language),
+            lambda: whisperx.load_align_model(language_code=self.language, device=self.device))
+
+    def _asr_model(self):
+        whisperx = backends.get("whisperx")
+        return self.registry.get(
+            ("asr", self.model, self.device, self.compute_type, self.language),
+            lambda: whisperx.load_model(self.model, device=self.device, compute_type=self.compute_type,
+                                        language=self.language),
+            size=ASR_MODEL_SIZES.get(self.model))
+
+    def warm(self) -> None:
+        if self.mode == "asr":
+            self._asr_model()
+
+        if self.mode != "tts":
+            self._align_model()
+
+    @instrumentation.instrumented("captions.align")
+    def _align(self, segments: list[dict], audio) -> list[dict]:
+        align_model, metadata = self._align_model()
+        aligned = backends.get("whisperx").align(segments, align_model, metadata, audio, device=self.device)
+        return aligned["word_segments"]
+
+    def _align_segment(self, text: str, audio: np.ndarray, sample_rate: int) -> list[dict]:
+        if sample_rate != WHISPER_SAMPLE_RATE:
+            torch, torchaudio = backends.get("torch"), backends.get("torchaudio")
+            audio = torchaudio.functional.resample(torch.from_numpy(audio), sample_rate, WHISPER_SAMPLE_RATE).numpy()
+
+        segments = [{
+            "text": self._join_words(text.split(" ")),
+            "start": 0.0,
+            "end": len(audio) / WHISPER_SAMPLE_RATE
+        }]
+        return self._align(segments, audio)
+
+    def segment_aligner(self, sample_rate: int) -> SegmentAligner:
+        return SegmentAligner(self, sample_rate, max_workers=self.align_workers)
+
+    def _segment_words(self, state: State) -> list[dict]:
+        audio = backends.get("whisperx").load_audio(str(state.final_audio_path))
+        aligner = self.segment_aligner(WHISPER_SAMPLE_RATE)
+        start = 0
+
+        for index, (sentence, duration) in enumerate(zip(TTSGenerator._generate_sentences(state),
+                                                         state.audio_clip_durations)):
+            end = start + round(duration * WHISPER_SAMPLE_RATE)
+            aligner(index, sentence, audio[start:end])
+            start = end
+
+        return aligner.words(state.audio_clip_durations)
+
+    @instrumentation.instrumented("captions.transcribe")
+    def _transcribe(self, audio) -> list[dict]:
+        return self._asr_model().transcribe(audio)["segments"]
+
+    def _words(self, state: State, aligner: SegmentAligner | None = None) -> list[dict]:
+        if aligner is not None:
+            return aligner.words(state.audio_clip_durations)
+
+        if self.mode == "tts" and state.word_timings:
+            return [timing.model_dump() for timing in state.word_timings]
+
+        if self.mode in ("tts", "segments") and state.audio_clip_durations and state.image_segments and state.script:
+            return self._segment_words(state)
+
+        audio = backends.get("whisperx").load_audio(str(state.final_audio_path))
+
+        if self.mode != "asr" and state.audio_clip_durations and state.image_segments and state.script:
+            segments = self._known_segments(state)
+        else:
+            segments = self._transcribe(audio)
+
+        return self._align(segments, audio)
 
-        align_model, metadata = whisperx.load_align_model(language_code="en", device=self.device)
-        aligned = whisperx.align(result["segments"], align_model, metadata, str(state.final_audio_path),
-                                 device=self.device)
-        words = aligned["word_segments"]
+    @instrumentation.instrumented("captions.generate")
+    def generate_captions(self, state: State, aligner: SegmentAligner | None = None) -> State:
+        words = self._words(state, aligner)
 
-        captions_file = tempfile.NamedTemporaryFile(delete=False, suffix=".srt", mode="w")
+        captions_file = tempfile.NamedTemporaryFile(delete=False, suffix=f".{self.caption_format}", mode="w")
+        captions_file.close()
 
-        subs = self._chunk_words(words, chunk_size=3)
-        self.write_srt(subs, srt_file_path=Path(captions_file.name))
+        if self.caption_format == "ass":
+            self.write_ass(words, ass_file_path=Path(captions_file.name), style=self.style)
+        else:
+            subs = self._chunk_words(words, chunk_size=3)
+            self.write_srt(subs, srt_file_path=Path(captions_file.name))
 
         state.caption_path = Path(captions_file.name)
 
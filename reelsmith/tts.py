@@ -1,23 +1,123 @@
+import json
+import struct
 import tempfile
 import threading
+import time
 import wave
 
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import contextmanager
+from importlib.metadata import PackageNotFoundError, version
+from queue import Queue, Empty
+from typing import TYPE_CHECKING, Callable, Iterator
+
 import ffmpeg
+import numpy as np
 import soundfile as sf
 
 from pathlib import Path
 
-from kokoro import KPipeline
+from reelsmith import instrumentation
+from reelsmith.backends import backends
+from reelsmith.cache import CACHE_DIR, SQLiteCache
+from reelsmith.stub import Script, State, WordTiming
+
+if TYPE_CHECKING:
+    from kokoro import KModel, KPipeline
+
+SAMPLE_RATE = 24000
+
+
+def default_audio_cache(max_bytes: int = 1024 ** 3) -> SQLiteCache:
+    return SQLiteCache(CACHE_DIR / "audio.sqlite3", max_bytes=max_bytes)
+
+
+def kokoro_version() -> str:
+    try:
+        return version("kokoro")
+    except PackageNotFoundError:
+        return "unknown"
+
+
+class KokoroPipelinePool:
+    def __init__(self, size: int = 2, device: str | None = None) -> None:
+        self.size = size
+        self._device = device
+
+        self._lock = threading.Lock()
+        self._models: dict[str, "KModel"] = {}
+        self._idle: dict[tuple[str, str, str], Queue["KPipeline"]] = {}
+        self._slots: dict[tuple[str, str, str], threading.BoundedSemaphore] = {}
+
+    @property
+    def device(self) -> str:
+        # KPipeline only picks a device when it builds its own model, so the shared one is placed the same way.
+        if self._device is None:
+            self._device = "cuda" if backends.get("torch").cuda.is_available() else "cpu"
+
+        return self._device
+
+    def _model(self, repo_id: str) -> "KModel":
+        with self._lock:
+            if repo_id not in self._models:
+                self._models[repo_id] = backends.get("kokoro.model")(repo_id=repo_id).to(self.device).eval()
+
+            return self._models[repo_id]
+
+    def _create(self, lang_code: str, repo_id: str, voice: str) -> "KPipeline":
+        pipeline = backends.get("kokoro.pipeline")(lang_code=lang_code, repo_id=repo_id, model=self._model(repo_id))
+        pipeline.load_voice(voice)
+        return pipeline
+
+    def _key_state(self, key: tuple[str, str, str]) -> tuple[Queue["KPipeline"], threading.BoundedSemaphore]:
+        with self._lock:
+            if key not in self._idle:
+                self._idle[key] = Queue()
+                self._slots[key] = threading.BoundedSemaphore(self.size)
+
+            return self._idle[key], self._slots[key]
+
+    @contextmanager
+    def acquire(self, lang_code: str, repo_id: str, voice: str) -> Iterator["KPipeline"]:
+        idle, slots = self._key_state((lang_code, repo_id, voice))
+
+        with slots:
+            try:
+                pipeline = idle.get_nowait()
+            except Empty:
+                pipeline = self._create(lang_code, repo_id, voice)
+
+            try:
+                yield pipeline
+            finally:
+                idle.put(pipeline)
+
+    def warm(self, lang_code: str, repo_id: str, voice: str) -> None:
+        with self.acquire(lang_code, repo_id, voice):
+            pass
+
 
-from reelsmith.stub import State
+pipeline_pool = KokoroPipelinePool()
 
 
 class TTSGenerator:
-    def __init__(self, voice: str, speed: float = 1.0):
+    def __init__(self, voice: str, speed: float = 1.0, lang_code: str = "a", repo_id: str = "hexgrad/Kokoro-82M",
+                 pool: KokoroPipelinePool | None = None, max_workers: int | None = None, assembly: str = "memory",
+                 cache: SQLiteCache | None = None):
+        if assembly not in ("memory", "files"):
+            raise ValueError(f"Unknown assembly mode: {assembly}")
+
         self.voice = voice
         self.speed = speed
+        self.lang_code = lang_code
+        self.repo_id = repo_id
+        self.pool = pool if pool is not None else pipeline_pool
+        self.max_workers = max_workers if max_workers is not None else self.pool.size
+        self.assembly = assembly
+        self.cache = cache
 
     @staticmethod
+    @instrumentation.instrumented("ffmpeg.concat")
     def _concatenate_wav_files(input_files: list[Path], output_file: Path) -> None:
         for file in input_files:
             if not file.exists():
@@ -43,26 +143,100 @@ class TTSGenerator:
         sentences = []
 
         for i in state.image_segments.image_segments:
-            words = state.script.script_words[i.word_range[0]:i.word_range[1] + 1]
-            sentence = " ".join(words)
-            sentences.append(sentence)
+            sentences.append(state.script.text(i.word_range[0], i.word_range[1]))
 
         return sentences
 
-    def _generate_audio(self, text: str) -> tuple[float, Path]:
-        pipeline = KPipeline(lang_code="a", repo_id="hexgrad/Kokoro-82M")
-        generator = pipeline(text, voice=self.voice, speed=self.speed)
+    @staticmethod
+    def _concatenate_arrays(chunks: list[np.ndarray]) -> np.ndarray:
+        output = np.empty(sum(len(chunk) for chunk in chunks), dtype=np.float32)
+
+        offset = 0
+        for chunk in chunks:
+            output[offset:offset + len(chunk)] = chunk
+            offset += len(chunk)
+
+        return output
+
+    @staticmethod
+    def _token_timings(tokens, offset: float) -> list[WordTiming]:
+        timings = []
+
+        for token in tokens or []:
+            text = token.text.strip()
+            if not text:
+                continue
+
+            if token.start_ts is None or token.end_ts is None or not any(c.isalnum() for c in text):
+                if timings:
+                    timings[-1].word += text
+                continue
+
+            timings.append(WordTiming(word=text, start=offset + token.start_ts, end=offset + token.end_ts))
+
+        return timings
+
+    def _cache_key(self, text: str) -> str:
+        return SQLiteCache.key(" ".join(text.split()), self.voice, repr(float(self.speed)), self.lang_code,
+                               self.repo_id, kokoro_version())
+
+    @staticmethod
+    def _pack(audio: np.ndarray, timings: list[WordTiming]) -> bytes:
+        header = json.dumps([timing.model_dump() for timing in timings]).encode()
+        return struct.pack("<I", len(header)) + header + audio.astype("<f2").tobytes()
+
+    @staticmethod
+    def _unpack(data: bytes) -> tuple[np.ndarray, list[WordTiming]]:
+        (header_size,) = struct.unpack_from("<I", data)
+        timings = [WordTiming(**timing) for timing in json.loads(data[4:4 + header_size])]
+        audio = np.frombuffer(data, dtype="<f2", offset=4 + header_size).astype(np.float32)
+        return audio, timings
+
+    def _synthesize(self, text: str) -> tuple[np.ndarray, list[WordTiming]]:
+        if self.cache is None:
+            return self._synthesize_uncached(text)
+
+        key = self._cache_key(text)
+        cached = self.cache.get(key)
+
+        if cached is not None:
+            instrumentation.count("tts.cache_hits")
+            return self._unpack(cached)
+
+        audio, timings = self._synthesize_uncached(text)
+        self.cache.set(key, self._pack(audio, timings))
+        return audio, timings
+
+    @instrumentation.instrumented("tts.generate_audio")
+    def _synthesize_uncached(self, text: str) -> tuple[np.ndarray, list[WordTiming]]:
+        chunks = []
+        timings = []
+        offset = 0
+
+        with self.pool.acquire(self.lang_code, self.repo_id, self.voice) as pipeline:
+            for result in pipeline(text, voice=self.voice, speed=self.speed):
+                if result.audio is None:
+                    continue
 
+                timings.extend(self._token_timings(result.tokens, offset / SAMPLE_RATE))
+                chunks.append(np.asarray(result.audio, dtype=np.float32))
+                offset += len(chunks[-1])
+
+        return self._concatenate_arrays(chunks), timings
+
+    @instrumentation.instrumented("tts.generate_audio")
+    def _generate_audio(self, text: str) -> tuple[float, Path]:
         generated_audio_files = []
         final_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode="wb")
 
-        for gs, ps, audio in generator:
-            temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode="wb")
-            temp_path = Path(temp_file.name)
-            generated_audio_files.append(temp_path)
-            temp_file.close()
+        with self.pool.acquire(self.lang_code, self.repo_id, self.voice) as pipeline:
+            for gs, ps, audio in pipeline(text, voice=self.voice, speed=self.speed):
+                temp_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode="wb")
+                temp_path = Path(temp_file.name)
+                generated_audio_files.append(temp_path)
+                temp_file.close()
 
-            sf.write(temp_path, audio, 24000)
+                sf.write(temp_path, audio, SAMPLE_RATE)
 
         self._concatenate_wav_files(generated_audio_files, output_file=Path(final_audio_file.name))
 
@@ -74,25 +248,52 @@ class TTSGenerator:
 
         return audio_duration, Path(final_audio_file.name)
 
-    def run_tts(self, state: State) -> State:
+    @staticmethod
+    def _offset_timings(results: list[tuple[np.ndarray, list[WordTiming]]]) -> list[WordTiming]:
+        word_timings = []
+        offset = 0.0
+
+        for audio, timings in results:
+            for timing in timings:
+                word_timings.append(WordTiming(word=timing.word, start=offset + timing.start, end=offset + timing.end))
+            offset += len(audio) / SAMPLE_RATE
+
+        return word_timings
+
+    def synthesize_narration(self, state: State, on_segment: Callable[[int, str, np.ndarray], None] | None = None,
+                             streamed: "StreamedSentences | None" = None
+                             ) -> tuple[np.ndarray, list[float], list[WordTiming]]:
         sentences = self._generate_sentences(state)
+        word_ranges = [segment.word_range for segment in state.image_segments.image_segments]
+
+        def synthesize(index: int, sentence: str) -> tuple[np.ndarray, list[WordTiming]]:
+            result = streamed.segment(state.script, *word_ranges[index]) if streamed is not None else None
+            audio, timings = result if result is not None else self._synthesize(sentence)
+
+            if on_segment is not None:
+                on_segment(index, sentence, audio)
+
+            return audio, timings
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(instrumentation.bind(synthesize), range(len(sentences)), sentences))
 
-        audio_durations = [None] * len(sentences)
-        audio_files = [None] * len(sentences)
+        segments = [segment for segment, _ in results]
+        audio_durations = [len(segment) / SAMPLE_RATE for segment in segments]
 
-        def worker(index: int, sentence: str):
-            audio_duration, audio_path = self._generate_audio(sentence)
-            audio_durations[index] = audio_duration
-            audio_files[index] = audio_path
+        instrumentation.count("tts.chars", sum(len(sentence) for sentence in sentences))
+        instrumentation.count("tts.audio_seconds", sum(audio_durations))
 
-        threads = []
-        for idx, sentence in enumerate(sentences):
-            t = threading.Thread(target=worker, args=(idx, sentence))
-            t.start()
-            threads.append(t)
+        return self._concatenate_arrays(segments), audio_durations, self._offset_timings(results)
 
-        for t in threads:
-            t.join()
+    def _run_tts_files(self, state: State) -> State:
+        sentences = self._generate_sentences(state)
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            results = list(executor.map(instrumentation.bind(self._generate_audio), sentences))
+
+        audio_durations = [duration for duration, _ in results]
+        audio_files = [path for _, path in results]
 
         final_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode="wb")
         self._concatenate_wav_files(audio_files,
@@ -103,4 +304,90 @@ class TTSGenerator:
 
         state.final_audio_path = Path(final_audio_file.name)
         state.audio_clip_durations = audio_durations
+        state.word_timings = None
+        return state
+
+    def run_tts(self, state: State, on_segment: Callable[[int, str, np.ndarray], None] | None = None,
+                streamed: "StreamedSentences | None" = None) -> State:
+        if self.assembly == "files":
+            if on_segment is not None or streamed is not None:
+                raise ValueError("Per-segment callbacks and streamed sentences require in-memory assembly")
+
+            return self._run_tts_files(state)
+
+        narration, audio_durations, word_timings = self.synthesize_narration(state, on_segment=on_segment,
+                                                                             streamed=streamed)
+
+        final_audio_file = tempfile.NamedTemporaryFile(delete=False, suffix=".wav", mode="wb")
+        final_audio_file.close()
+        sf.write(final_audio_file.name, narration, SAMPLE_RATE)
+
+        state.final_audio_path = Path(final_audio_file.name)
+        state.audio_clip_durations = audio_durations
+        state.word_timings = word_timings
         return state
+
+
+class StreamedSentences:
+    """
+    Synthesizes script sentences as soon as they are streamed, before the script (and its image segments) exist.
+
+    Once segments are known, a segment made of whole streamed sentences reuses their audio; any other segment
+    returns ``None`` so the caller synthesizes its text as usual.
+    """
+
+    def __init__(self, generator: TTSGenerator) -> None:
+        self.generator = generator
+
+        self._lock = threading.Lock()
+        self._futures: dict[str, Future] = {}
+        self._started = time.perf_counter()
+        self._first_audio = False
+        self._executor = ThreadPoolExecutor(max_workers=generator.max_workers, thread_name_prefix="reelsmith-tts")
+
+    @staticmethod
+    def _normalize(text: str) -> str:
+        return " ".join(text.split())
+
+    def _synthesize(self, sentence: str) -> tuple[np.ndarray, list[WordTiming]]:
+        result = self.generator._synthesize(sentence)
+
+        with self._lock:
+            first, self._first_audio = not self._first_audio, True
+
+        if first:
+            instrumentation.gauge("tts.time_to_first_audio_seconds", time.perf_counter() - self._started)
+
+        return result
+
+    def submit(self, sentence: str) -> None:
+        key = self._normalize(sentence)
+
+        with self._lock:
+            if key and key not in self._futures:
+                self._futures[key] = self._executor.submit(instrumentation.bind(self._synthesize), sentence)
+
+    def segment(self, script: Script, start: int, end: int) -> tuple[np.ndarray, list[WordTiming]] | None:
+        sentences = [(first, last) for first, last in script.sentences if start <= first and last <= end]
+
+        if not sentences or sentences[0][0] != start or sentences[-1][1] != end:
+            return None
+
+        with self._lock:
+            futures = [self._futures.get(self._normalize(script.text(first, last))) for first, last in sentences]
+
+        if any(future is None for future in futures):
+            return None
+
+        results = [future.result() for future in futures]
+        audio = TTSGenerator._concatenate_arrays([audio for audio, _ in results])
+        return audio, TTSGenerator._offset_timings(results)
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+    def __enter__(self) -> "StreamedSentences":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
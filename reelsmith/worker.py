@@ -0,0 +1,234 @@
+import json
+import mimetypes
+import shutil
+import threading
+import time
+import traceback
+import uuid
+
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from socketserver import ThreadingMixIn, UnixStreamServer
+from typing import Any
+
+from reelsmith import instrumentation
+from reelsmith.checkpoint import ARTIFACT_FIELDS, CheckpointStore
+from reelsmith.pipeline import STAGES, Stage, build_graph, warm
+from reelsmith.stub import State
+
+
+class Job:
+    def __init__(self, topic: str) -> None:
+        self.id = uuid.uuid4().hex[:12]
+        self.topic = topic
+        self.status = "queued"
+        self.error: str | None = None
+        self.state: State | None = None
+        self.recorder = instrumentation.Recorder(run_id=topic)
+
+        self.submitted_at = time.time()
+        self.started_at: float | None = None
+        self.finished_at: float | None = None
+
+    def artifact(self, name: str) -> Path | None:
+        if name not in ARTIFACT_FIELDS or self.state is None:
+            return None
+
+        path = getattr(self.state, name)
+        return Path(path) if path is not None and Path(path).exists() else None
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            "id": self.id,
+            "topic": self.topic,
+            "status": self.status,
+            "error": self.error,
+            "submitted_at": self.submitted_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "artifacts": [name for name in ARTIFACT_FIELDS if self.artifact(name) is not None],
+        }
+
+
+class Worker:
+    """
+    Runs jobs through one compiled graph in a long-lived process, so models stay loaded between videos. Only the
+    ``keep_jobs`` most recently submitted finished jobs are remembered; their artifacts stay on disk.
+    """
+
+    def __init__(self, stages: list[Stage] = STAGES, store: CheckpointStore | None = None, jobs: int = 1,
+                 keep_jobs: int = 100) -> None:
+        self.stages = stages
+        self.graph = build_graph(stages=stages, store=store)
+        self.jobs: dict[str, Job] = {}
+        self.keep_jobs = keep_jobs
+
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="reelsmith-job")
+
+    def warm(self) -> None:
+        warm(self.stages)
+
+    def _run(self, job: Job) -> None:
+        job.status = "running"
+        job.started_at = time.time()
+
+        try:
+            with instrumentation.recording(job.recorder):
+                job.state = State(**self.graph.invoke(State(topic=job.topic)))
+        except Exception as e:
+            job.error = "".join(traceback.format_exception_only(e)).strip()
+            job.status = "failed"
+        else:
+            job.status = "done"
+        finally:
+            job.finished_at = time.time()
+            self._evict()
+
+    def _evict(self) -> None:
+        with self._lock:
+            finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+
+            # Jobs are in submission order, so the oldest finished ones go first.
+            for job_id in finished[:max(0, len(finished) - self.keep_jobs)]:
+                del self.jobs[job_id]
+
+    def submit(self, topic: str) -> Job:
+        job = Job(topic)
+
+        with self._lock:
+            self.jobs[job.id] = job
+
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id: str) -> Job | None:
+        with self._lock:
+            return self.jobs.get(job_id)
+
+    def list_jobs(self) -> list[Job]:
+        with self._lock:
+            return list(self.jobs.values())
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=True, cancel_futures=True)
+
+
+class WorkerRequestHandler(BaseHTTPRequestHandler):
+    server: "WorkerHTTPServer | WorkerUnixServer"
+
+    def address_string(self) -> str:
+        # Unix socket peers have no (host, port) address.
+        return self.client_address[0] if isinstance(self.client_address, tuple) else "unix"
+
+    def _send_json(self, body: Any, status: HTTPStatus = HTTPStatus.OK) -> None:
+        data = json.dumps(body).encode()
+
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _send_error(self, status: HTTPStatus, message: str) -> None:
+        self._send_json({"error": message}, status)
+
+    def _send_file(self, path: Path) -> None:
+        self.send_response(HTTPStatus.OK)
+        self.send_header("Content-Type", mimetypes.guess_type(path.name)[0] or "application/octet-stream")
+        self.send_header("Content-Length", str(path.stat().st_size))
+        self.send_header("Content-Disposition", f'attachment; filename="{path.name}"')
+        self.end_headers()
+
+        with path.open("rb") as f:
+            shutil.copyfileobj(f, self.wfile)
+
+    def _job(self, job_id: str) -> Job | None:
+        job = self.server.worker.get(job_id)
+
+        if job is None:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown job: {job_id}")
+
+        return job
+
+    def do_GET(self) -> None:
+        parts = [part for part in self.path.split("?", 1)[0].split("/") if part]
+        worker = self.server.worker
+
+        if parts == ["health"]:
+            self._send_json({"status": "ok", "jobs": len(worker.list_jobs())})
+
+        elif parts == ["jobs"]:
+            self._send_json([job.to_dict() for job in worker.list_jobs()])
+
+        elif len(parts) == 2 and parts[0] == "jobs":
+            if (job := self._job(parts[1])) is not None:
+                self._send_json(job.to_dict())
+
+        elif len(parts) == 3 and parts[0] == "jobs" and parts[2] == "metrics":
+            if (job := self._job(parts[1])) is not None:
+                self._send_json(job.recorder.to_dict())
+
+        elif len(parts) == 4 and parts[0] == "jobs" and parts[2] == "artifacts":
+            if (job := self._job(parts[1])) is None:
+                return
+
+            path = job.artifact(parts[3])
+            if path is None:
+                self._send_error(HTTPStatus.NOT_FOUND, f"No {parts[3]} artifact for job {job.id}")
+            else:
+                self._send_file(path)
+
+        else:
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path: {self.path}")
+
+    def do_POST(self) -> None:
+        if self.path.rstrip("/") != "/jobs":
+            self._send_error(HTTPStatus.NOT_FOUND, f"Unknown path: {self.path}")
+            return
+
+        try:
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            topic = body["topic"].strip()
+        except (ValueError, KeyError, TypeError, AttributeError):
+            self._send_error(HTTPStatus.BAD_REQUEST, 'Expected a JSON body like {"topic": "..."}')
+            return
+
+        if not topic:
+            self._send_error(HTTPStatus.BAD_REQUEST, "Topic must not be empty")
+            return
+
+        self._send_json(self.server.worker.submit(topic).to_dict(), HTTPStatus.ACCEPTED)
+
+
+class WorkerHTTPServer(ThreadingHTTPServer):
+    def __init__(self, address: tuple[str, int], worker: Worker) -> None:
+        super().__init__(address, WorkerRequestHandler)
+        self.worker = worker
+
+
+class WorkerUnixServer(ThreadingMixIn, UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path: Path, worker: Worker) -> None:
+        Path(path).unlink(missing_ok=True)
+        super().__init__(str(path), WorkerRequestHandler)
+        self.worker = worker
+
+    def server_close(self) -> None:
+        super().server_close()
+        Path(self.server_address).unlink(missing_ok=True)
+
+
+def serve(worker: Worker, host: str = "127.0.0.1", port: int = 8765, socket_path: Path | None = None) -> None:
+    server = WorkerUnixServer(socket_path, worker) if socket_path is not None else WorkerHTTPServer((host, port), worker)
+
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        worker.shutdown()
@@ -0,0 +1,56 @@
+import time
+
+from pathlib import Path
+
+from reelsmith.broker import Handoff, SQLiteBroker
+
+
+def expire(broker: SQLiteBroker, task_id: str) -> None:
+    broker._connection.execute("UPDATE tasks SET leased_until = ? WHERE id = ?", (time.time() - 1, task_id))
+
+
+def test_stale_worker_is_fenced_out(tmp_path: Path) -> None:
+    broker = SQLiteBroker(tmp_path / "broker.sqlite3")
+    broker.put("run", "research", {"index": 0})
+
+    stale = broker.claim(["research"], "a", lease=60)
+    expire(broker, stale.id)
+    fresh = broker.claim(["research"], "b", lease=60)
+    assert fresh.id == stale.id
+
+    assert not broker.extend(stale.id, "a", lease=60)
+    assert not broker.complete(stale.id, "a", {"state": {}}, Handoff("script", {"index": 1}))
+    assert not broker.fail(stale.id, "a", "error", retry=True)
+    assert broker.status("run")["stage"] == "research"
+    assert broker.status("run")["status"] == "running"
+
+    assert broker.complete(fresh.id, "b", {"state": {}}, Handoff("script", {"index": 1}, priority=1))
+    assert broker.status("run")["stage"] == "script"
+    assert broker.claim(["script"], "b", lease=60).payload == {"index": 1}
+
+
+def test_expired_task_fails_after_max_attempts(tmp_path: Path) -> None:
+    broker = SQLiteBroker(tmp_path / "broker.sqlite3")
+    broker.put("run", "tts", {})
+
+    for attempt in range(1, 3):
+        task = broker.claim(["tts"], "a", lease=60, max_attempts=2)
+        assert task.attempts == attempt
+        expire(broker, task.id)
+
+    assert broker.claim(["tts"], "a", lease=60, max_attempts=2) is None
+    status = broker.status("run")
+    assert status["status"] == "failed"
+    assert "Lease expired" in status["error"]
+
+
+def test_retried_task_can_be_claimed_again(tmp_path: Path) -> None:
+    broker = SQLiteBroker(tmp_path / "broker.sqlite3")
+    broker.put("run", "tts", {})
+
+    task = broker.claim(["tts"], "a", lease=60)
+    assert broker.fail(task.id, "a", "error", retry=True)
+
+    retried = broker.claim(["tts"], "b", lease=60)
+    assert retried.id == task.id
+    assert retried.attempts == 2
@@ -0,0 +1,57 @@
+import json
+import logging
+import time
+
+from pathlib import Path
+
+import pytest
+
+from reelsmith.checkpoint import CheckpointStore, checkpointed
+from reelsmith.stub import State
+
+
+def counting_node(calls: list[str]):
+    def node(state: State) -> dict:
+        calls.append(state.topic)
+        return {"search_summary": [f"research {len(calls)}"]}
+
+    return node
+
+
+def test_checkpoint_is_reused_and_logged(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    calls = []
+    node = checkpointed(CheckpointStore(tmp_path), "run", "research", counting_node(calls))
+
+    assert node(State(topic="topic")) == {"search_summary": ["research 1"]}
+
+    with caplog.at_level(logging.INFO, logger="reelsmith.checkpoint"):
+        assert node(State(topic="topic")) == {"search_summary": ["research 1"]}
+
+    assert calls == ["topic"]
+    assert "Skipping research for run" in caplog.text
+
+
+def test_expired_checkpoint_is_ignored(tmp_path: Path) -> None:
+    calls = []
+    store = CheckpointStore(tmp_path, max_age=60)
+    node = checkpointed(store, "run", "research", counting_node(calls))
+    node(State(topic="topic"))
+
+    path = tmp_path / "run" / "research.json"
+    checkpoint = json.loads(path.read_text())
+    checkpoint["created_at"] = time.time() - 120
+    path.write_text(json.dumps(checkpoint))
+
+    assert node(State(topic="topic")) == {"search_summary": ["research 2"]}
+    assert len(calls) == 2
+
+
+def test_cleared_run_starts_fresh(tmp_path: Path) -> None:
+    calls = []
+    store = CheckpointStore(tmp_path)
+    node = checkpointed(store, "run", "research", counting_node(calls))
+    node(State(topic="topic"))
+
+    store.clear("run")
+
+    assert node(State(topic="topic")) == {"search_summary": ["research 2"]}
@@ -0,0 +1,19 @@
+from reelsmith import instrumentation
+
+
+def test_prometheus_exports_counters_and_gauges() -> None:
+    recorder = instrumentation.Recorder("run")
+
+    with instrumentation.recording(recorder):
+        instrumentation.count("llm.cache_hits", int(True))
+        instrumentation.count("llm.cache_hits", int(False))
+        instrumentation.gauge("tts.time_to_first_audio_seconds", 0.5)
+        instrumentation.gauge("tts.time_to_first_audio_seconds", 0.25)
+
+    lines = recorder.to_prometheus().splitlines()
+
+    assert "# TYPE reelsmith_llm_cache_hits_total counter" in lines
+    assert 'reelsmith_llm_cache_hits_total{run="run"} 1' in lines
+    assert "# TYPE reelsmith_tts_time_to_first_audio_seconds gauge" in lines
+    assert 'reelsmith_tts_time_to_first_audio_seconds{run="run"} 0.25' in lines
+    assert recorder.to_dict()["gauges"] == {"tts.time_to_first_audio_seconds": 0.25}
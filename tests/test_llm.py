@@ -0,0 +1,233 @@
+import asyncio
+import time
+
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from reelsmith.llm import ConcurrencyController
+
+
+def test_more_waiters_than_executor_threads() -> None:
+    controller = ConcurrencyController("test", initial_limit=1, max_limit=1, deadline=5)
+
+    async def attempt() -> None:
+        # Like LangChain's default _agenerate, each attempt needs an executor thread of its own.
+        await asyncio.get_running_loop().run_in_executor(None, time.sleep, 0.01)
+
+    async def main() -> None:
+        asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=1))
+        await asyncio.gather(*(controller.acall(f"key-{i}", attempt) for i in range(9)))
+
+    asyncio.run(main())
+    assert controller.in_flight == 0
+
+
+def test_cancelled_waiter_does_not_leak_its_slot() -> None:
+    controller = ConcurrencyController("test", initial_limit=1, max_limit=1)
+
+    async def main() -> None:
+        release = asyncio.Event()
+
+        async def hold() -> None:
+            async def chunks():
+                yield "chunk"
+                await release.wait()
+
+            async for _ in controller.astream(chunks):
+                pass
+
+        holder = asyncio.create_task(hold())
+        await asyncio.sleep(0)
+
+        waiter = asyncio.create_task(controller._aacquire(time.monotonic() + 5))
+        await asyncio.sleep(0)
+
+        waiter.cancel()
+        release.set()
+        await holder
+
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+
+        assert controller.in_flight == 0
+        await asyncio.wait_for(controller._aacquire(time.monotonic() + 5), 1)
+        assert controller.in_flight == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_wakeup_is_passed_on() -> None:
+    controller = ConcurrencyController("test", initial_limit=1, max_limit=1)
+
+    async def main() -> None:
+        await controller._aacquire(time.monotonic() + 5)
+
+        first = asyncio.create_task(controller._aacquire(time.monotonic() + 5))
+        second = asyncio.create_task(controller._aacquire(time.monotonic() + 5))
+        await asyncio.sleep(0)
+
+        # The free slot is handed to the first waiter, which is cancelled before it can take it.
+        controller._release(None)
+        first.cancel()
+
+        await asyncio.wait_for(second, 1)
+        assert controller.in_flight == 1
+
+    asyncio.run(main())
+
+
+def test_cancelled_call_releases_its_slot() -> None:
+    controller = ConcurrencyController("test", initial_limit=1, max_limit=1)
+
+    async def main() -> None:
+        task = asyncio.create_task(controller.acall("key", lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0.01)
+
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(main())
+    assert controller.in_flight == 0
+
+
+def test_waiter_times_out_at_deadline() -> None:
+    controller = ConcurrencyController("test", initial_limit=1, max_limit=1)
+
+    async def main() -> None:
+        await controller._aacquire(time.monotonic() + 5)
+
+        with pytest.raises(TimeoutError):
+            await controller._aacquire(time.monotonic() + 0.05)
+
+        assert not controller._waiters
+
+    asyncio.run(main())
+    assert controller.in_flight == 1
+
+
+def test_stream_released_on_base_exception() -> None:
+    controller = ConcurrencyController("test", initial_limit=1, max_limit=1)
+
+    def chunks():
+        yield "chunk"
+        raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        list(controller.stream(chunks))
+
+    assert controller.in_flight == 0
+    assert controller.limit == 1
+
+
+def test_stream_retries_until_first_chunk() -> None:
+    controller = ConcurrencyController("test", base_delay=0.001)
+    attempts = []
+
+    def chunks():
+        attempts.append(None)
+        if len(attempts) < 3:
+            raise TimeoutError
+
+        yield "a"
+        yield "b"
+
+    assert list(controller.stream(chunks)) == ["a", "b"]
+    assert len(attempts) == 3
+    assert controller.in_flight == 0
+
+
+def test_stream_not_retried_after_first_chunk() -> None:
+    controller = ConcurrencyController("test", base_delay=0.001)
+    attempts = []
+
+    async def chunks():
+        attempts.append(None)
+        yield "a"
+        raise TimeoutError
+
+    async def main() -> list[str]:
+        received = []
+
+        with pytest.raises(TimeoutError):
+            async for chunk in controller.astream(chunks):
+                received.append(chunk)
+
+        return received
+
+    assert asyncio.run(main()) == ["a"]
+    assert len(attempts) == 1
+    assert controller.in_flight == 0
+
+
+def test_astream_retries_until_first_chunk() -> None:
+    controller = ConcurrencyController("test", base_delay=0.001)
+    attempts = []
+
+    async def chunks():
+        attempts.append(None)
+        if len(attempts) < 2:
+            raise ConnectionError
+
+        yield "a"
+
+    async def main() -> list[str]:
+        return [chunk async for chunk in controller.astream(chunks)]
+
+    assert asyncio.run(main()) == ["a"]
+    assert len(attempts) == 2
+    assert controller.in_flight == 0
+
+
+def test_follower_takes_over_when_leader_is_cancelled() -> None:
+    controller = ConcurrencyController("test")
+
+    async def main() -> None:
+        started = asyncio.Event()
+
+        async def slow() -> str:
+            started.set()
+            await asyncio.sleep(10)
+            return "leader"
+
+        async def fast() -> str:
+            return "follower"
+
+        leader = asyncio.create_task(controller.acall("key", slow))
+        await started.wait()
+
+        follower = asyncio.create_task(controller.acall("key", fast))
+        await asyncio.sleep(0)
+
+        leader.cancel()
+        assert await follower == "follower"
+        assert leader.cancelled()
+        assert not follower.cancelled()
+
+    asyncio.run(main())
+    assert controller.in_flight == 0
+
+
+def test_coalesced_callers_get_their_own_response() -> None:
+    controller = ConcurrencyController("test")
+
+    async def main() -> None:
+        release = asyncio.Event()
+
+        async def respond() -> dict[str, list[str]]:
+            await release.wait()
+            return {"chunks": ["a"]}
+
+        calls = [asyncio.create_task(controller.acall("key", respond)) for _ in range(3)]
+        await asyncio.sleep(0)
+        release.set()
+
+        responses = await asyncio.gather(*calls)
+        assert responses == [{"chunks": ["a"]}] * 3
+
+        responses[0]["chunks"].append("b")
+        assert responses[1] == responses[2] == {"chunks": ["a"]}
+        assert responses[1] is not responses[2]
+
+    asyncio.run(main())
@@ -0,0 +1,47 @@
+import asyncio
+
+import pytest
+
+from reelsmith import pipeline
+from reelsmith.stub import State
+
+
+class LoopBoundLLM:
+    """Like langchain-google-genai's async client, usable only on the event loop it was first used on."""
+
+    def __init__(self, model: str, cache=None) -> None:
+        self.loop: asyncio.AbstractEventLoop | None = None
+
+    async def ainvoke(self, prompt: str) -> str:
+        loop = asyncio.get_running_loop()
+
+        if self.loop is None:
+            self.loop = loop
+        elif self.loop is not loop:
+            raise RuntimeError("Client is bound to a different event loop")
+
+        return f"summary of {prompt}"
+
+
+class FakeResearch:
+    def __init__(self, llm: LoopBoundLLM, instruction: str, **kwargs) -> None:
+        self.llm = llm
+
+    async def research(self, state: State) -> State:
+        state.search_summary = [await self.llm.ainvoke(state.topic)]
+        return state
+
+
+@pytest.fixture
+def fake_research(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(pipeline, "GoogleLLM", LoopBoundLLM)
+    monkeypatch.setattr(pipeline, "SearXNGResearch", FakeResearch)
+    monkeypatch.setattr(pipeline, "response_cache", lambda: None)
+    monkeypatch.setattr(pipeline, "page_cache", lambda: None)
+    monkeypatch.setattr(pipeline, "summary_cache", lambda: None)
+
+
+def test_research_node_runs_twice(fake_research: None) -> None:
+    # Each call runs its own event loop, so a client shared between calls would be bound to a closed one.
+    assert pipeline.research_node(State(topic="first")) == {"search_summary": ["summary of first"]}
+    assert pipeline.research_node(State(topic="second")) == {"search_summary": ["summary of second"]}
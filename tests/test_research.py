@@ -0,0 +1,47 @@
+import asyncio
+
+import httpx
+
+from reelsmith import instrumentation
+from reelsmith.research import Research
+from reelsmith.stub import State
+
+GOOD_URL = "https://example.com/article"
+BAD_URLS = ["http://[bad", "https://xn--.com/", "http://\x00.com"]
+
+
+class FakeMessage:
+    def __init__(self, content: str) -> None:
+        self.content = content
+
+
+class FakeLLM:
+    model = "fake"
+
+    async def ainvoke(self, prompt: str) -> FakeMessage:
+        return FakeMessage("summary")
+
+
+class StaticResearch(Research):
+    async def _search(self, client: httpx.AsyncClient, topic: str, max_results: int = 5) -> list[str]:
+        return [*BAD_URLS, GOOD_URL]
+
+
+def handler(request: httpx.Request) -> httpx.Response:
+    return httpx.Response(200, headers={"Content-Type": "text/html"},
+                          text="<p>A paragraph that is long enough to be kept by the extractor, hopefully.</p>")
+
+
+def test_bad_urls_are_dropped_individually() -> None:
+    recorder = instrumentation.Recorder()
+
+    async def main() -> State:
+        async with httpx.AsyncClient(transport=httpx.MockTransport(handler)) as client:
+            research = StaticResearch(FakeLLM(), "", client=client)
+            return await research.research(State(topic="topic"))
+
+    with instrumentation.recording(recorder):
+        state = asyncio.run(main())
+
+    assert state.search_summary == ["", "", "", "summary"]
+    assert recorder.counters["research.fetch_errors"] == len(BAD_URLS)
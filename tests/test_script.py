@@ -0,0 +1,48 @@
+import pytest
+
+from reelsmith.script import SentenceStream, repair_word_ranges, segment_words, valid_word_ranges
+from reelsmith.stub import Script, sentence_ranges
+
+
+def sentences(text: str) -> list[str]:
+    script = Script.from_text(text)
+    return [script.text(start, end) for start, end in script.sentences]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("The U.S. economy grew. Prices fell.", ["The U.S. economy grew.", "Prices fell."]),
+    ("Ask J. Smith about it. He knows.", ["Ask J. Smith about it.", "He knows."]),
+    ("Some fruit, e.g. apples, is sweet. Try it!", ["Some fruit, e.g. apples, is sweet.", "Try it!"]),
+    ("It rose 3.5% in 2020. Then it fell.", ["It rose 3.5% in 2020.", "Then it fell."]),
+    ("Stop. Really?! Yes.", ["Stop.", "Really?!", "Yes."]),
+])
+def test_sentences_skip_abbreviations(text: str, expected: list[str]) -> None:
+    assert sentences(text) == expected
+
+
+def test_sentence_ranges_of_attached_punctuation() -> None:
+    words = ["The", "U.S.", "economy", "grew.", "Stop.", "Really?", "Yes."]
+    assert sentence_ranges(words) == [[0, 3], [4, 4], [5, 5], [6, 6]]
+
+
+def test_empty_script_has_no_segments() -> None:
+    assert segment_words([]) == []
+    assert sentence_ranges([]) == []
+
+
+def test_segments_cover_the_script() -> None:
+    words = Script.from_text(" ".join(f"Sentence number {i} is here." for i in range(20))).script_words
+    segments = segment_words(words)
+
+    assert 6 <= len(segments) <= 8
+    assert valid_word_ranges(segments, len(words))
+    assert valid_word_ranges(repair_word_ranges([[0, 3], [2, 9]], len(words)), len(words))
+
+
+def test_sentence_stream_waits_for_the_next_word() -> None:
+    stream = SentenceStream()
+
+    assert stream.feed("The U.S. economy grew.") == []
+    assert stream.feed(" Prices") == ["The U.S. economy grew."]
+    assert stream.feed(" fell, e.g. bread. ") == []
+    assert stream.close() == ["Prices fell, e.g. bread."]
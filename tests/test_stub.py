@@ -0,0 +1,11 @@
+from reelsmith.stub import Script, State
+
+
+def test_merged_validates_only_the_update() -> None:
+    state = State(topic="topic", search_summary=["research"])
+    merged = state.merged({"script": {"script_plaintext": "Hello there.", "script_words": ["Hello", "there", "."]}})
+
+    assert isinstance(merged.script, Script)
+    assert merged.script.word_offsets == [0, 5, 6, 11, 11, 12]
+    assert merged.search_summary is state.search_summary
+    assert state.script is None